@@ -1,34 +1,50 @@
 # ai_analyzer.py
 from anthropic import Anthropic
-import json
-from typing import List, Dict, Union
+import io
+import orjson
+import re
+from itertools import islice
+from typing import List, Dict
 import os
+from response_cache import cached_analysis
 
-class AILogAnalyzer:
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
-        if not self.api_key:
-            raise ValueError("Anthropic API key is required. Set ANTHROPIC_API_KEY environment variable or pass it directly.")
-        
-        self.client = Anthropic(api_key=self.api_key)
-    
-    def analyze_logs(self, logs: Dict, system_info: Dict = None) -> Dict:
-        """Analyze logs using Claude API and return recommendations"""
-        
-        # Convert any sets to lists for JSON serialization
-        logs = self._prepare_json_serializable(logs)
-        if system_info:
-            system_info = self._prepare_json_serializable(system_info)
-        
-        # Prepare the context for Claude
-        context = self._prepare_context(logs, system_info)
-        
-        try:
-            response = self.client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=4096,
-                temperature=0,
-                system="""You are an expert system administrator analyzing Proxmox/Linux cluster logs.
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+CRITICAL_KEYWORDS = (
+    "critical", "immediate attention", "severe", "urgent", "failure",
+    "lost lock", "cluster issue", "ha failure"
+)
+WARNING_KEYWORDS = (
+    "warning", "attention needed", "moderate", "should be addressed"
+)
+
+
+def _build_severity_automaton(tiers):
+    """Compile all keyword tiers into one Aho-Corasick automaton mapping
+    each keyword to its severity, so classification is a single pass"""
+    automaton = ahocorasick.Automaton()
+    for severity, words in tiers:
+        for word in words:
+            automaton.add_word(word, severity)
+    automaton.make_automaton()
+    return automaton
+
+
+if ahocorasick is not None:
+    _SEVERITY_AUTOMATON = _build_severity_automaton((
+        ("critical", CRITICAL_KEYWORDS),
+        ("warning", WARNING_KEYWORDS),
+    ))
+else:
+    _SEVERITY_AUTOMATON = None
+
+# Module-level constant so the bytes are identical on every request --
+# Anthropic's prompt cache matches on the exact prefix, so any drift in
+# whitespace or wording would invalidate the cached entry.
+SYSTEM_RUBRIC = """You are an expert system administrator analyzing Proxmox/Linux cluster logs.
                          You should focus particularly on cluster health, high availability status,
                          backup performance, and service stability.
 
@@ -47,13 +63,224 @@ class AILogAnalyzer:
 
                          === Preventive Measures ===
                          [Ways to prevent similar issues]
-                         """,
+                         """
+
+# Constant worked example appended to the rubric. It doubles as a one-shot
+# example for output adherence and as padding: the rubric alone is well under
+# Anthropic's 1024-token minimum cacheable prefix, and a sub-minimum system
+# block silently misses the cache on every call.
+OUTPUT_SCHEMA_EXAMPLE = """
+                         ## Output Schema Example
+
+                         Given logs showing a corosync link flap and one failed
+                         backup, a correct response looks like this:
+
+                         === Overall Assessment ===
+                         The cluster is degraded: node pve2 briefly lost corosync
+                         connectivity and the nightly backup of VM 103 failed.
+                         Core services recovered without intervention.
+
+                         === Critical Issues ===
+                         - corosync on pve2 reported "link 0 down" at 02:14 and
+                           rejoined the membership 40 seconds later; quorum was
+                           retained but a second concurrent failure would have
+                           frozen HA recovery
+                         - vzdump backup of VM 103 aborted with "lvremove failed"
+                           leaving a stale snapshot that will block the next run
+
+                         === Service Issues ===
+                         - pve-ha-lrm logged repeated "loop take too long" warnings
+                           during the corosync flap
+                         - pveproxy returned 596 errors to the web UI while the
+                           cluster filesystem was read-only
+
+                         === Recommendations ===
+                         1. Remove the stale snapshot of VM 103 with lvremove and
+                            re-run the backup job
+                         2. Check the physical link and switch port behind corosync
+                            link 0 on pve2 for errors or flapping
+                         3. Review /etc/pve/corosync.conf for a redundant second
+                            ring so a single link loss cannot isolate a node
+
+                         === Preventive Measures ===
+                         - Configure a second corosync link on a separate switch
+                         - Alert on cache/backup job exit status instead of relying
+                           on the nightly email
+                         - Graph corosync link state to catch slow link degradation
+
+                         Always follow this exact section layout. If a section has
+                         no findings, keep the header and state that explicitly.
+
+                         ## Formatting Rules
+
+                         - Every section header sits on its own line as
+                           === Section Name === with no other text on the line
+                         - Critical Issues lists concrete failures with the
+                           affected host, service or VM and the first timestamp
+                           seen; write "No critical issues detected" when the
+                           logs show none
+                         - Service Issues covers degraded-but-running services:
+                           restarts, timeouts, elevated error rates, failed
+                           health checks
+                         - Recommendations are numbered, imperative and ordered
+                           by urgency; each names the exact command, config file
+                           or unit to act on where the logs make it known
+                         - Preventive Measures are bullet points describing
+                           monitoring, redundancy or configuration changes that
+                           would stop the issue recurring
+                         - Never invent hosts, services or numbers that do not
+                           appear in the provided logs; say "not visible in the
+                           provided logs" instead of guessing
+                         - Keep the Overall Assessment to one or two sentences;
+                           detail belongs in the later sections
+                         """
+
+# Heuristic ~4 chars/token; Anthropic ignores cache breakpoints on prefixes
+# shorter than 1024 tokens, so marking small blocks is pointless.
+MIN_CACHEABLE_CHARS = 1024 * 4
+
+# Token budget for the dynamic log tail of the user message; keeps huge log
+# bundles from truncating the response mid-section.
+MAX_CONTEXT_TOKENS = 8000
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap ~4 chars/token estimate; close enough for budgeting"""
+    return len(text) // 4
+
+
+# Pad the rubric past the cacheable minimum with the constant example
+if _estimate_tokens(SYSTEM_RUBRIC) < 1200:
+    SYSTEM_RUBRIC = SYSTEM_RUBRIC + OUTPUT_SCHEMA_EXAMPLE
+
+# Masks digits so messages differing only in timestamps/PIDs/counters
+# dedupe to one example
+_NUM_RE = re.compile(r'\d+')
+
+# Section header and bullet/numbered-item lines in the AI response
+_HDR_RE = re.compile(r'^===\s*(.+?)\s*===$')
+_BULLET_RE = re.compile(r'^(?:[-•*]|\d+\.)\s*(.+)$')
+
+
+def _json_default(obj):
+    """Fallback for types orjson can't serialize natively.
+
+    Sets are sorted so the output stays byte-stable for the prompt cache.
+    """
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    return str(obj)
+
+
+def _dumps_indented(obj) -> str:
+    """Serialize with stable key order so repeat prompts stay byte-identical"""
+    return orjson.dumps(
+        obj,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        default=_json_default
+    ).decode()
+
+
+def _log_cache_usage(response):
+    """Print prompt-cache hit/miss counters when the API reports them"""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    read = getattr(usage, 'cache_read_input_tokens', None)
+    created = getattr(usage, 'cache_creation_input_tokens', None)
+    if read or created:
+        print(f"Prompt cache: {read or 0} tokens read, {created or 0} tokens created")
+
+
+class SectionStreamParser:
+    """Incremental version of the section parser: feed response text as it
+    arrives and read partial sections at any point, instead of waiting for
+    the complete response"""
+
+    def __init__(self):
+        self._buffer = ""
+        self.sections = {}
+        self._current_section = None
+        self._current_items = []
+
+    def feed(self, chunk: str) -> None:
+        """Consume a chunk of response text, processing any complete lines"""
+        self._buffer += chunk
+        # Split off everything up to the last newline in one pass; the
+        # trailing partial line stays buffered for the next feed
+        cut = self._buffer.rfind('\n')
+        if cut < 0:
+            return
+        complete, self._buffer = self._buffer[:cut], self._buffer[cut + 1:]
+        for line in complete.split('\n'):
+            self._feed_line(line)
+
+    def _feed_line(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+
+        # One precompiled match per line instead of several prefix tests
+        if (m := _HDR_RE.match(line)):
+            self._flush_section()
+            self._current_section = m.group(1)
+        elif (m := _BULLET_RE.match(line)):
+            if self._current_section:
+                self._current_items.append(m.group(1))
+        elif self._current_section:
+            self._current_items.append(line)
+
+    def _flush_section(self) -> None:
+        if self._current_section and self._current_items:
+            self.sections[self._current_section] = self._current_items
+        self._current_items = []
+
+    def finish(self) -> Dict[str, List[str]]:
+        """Process any trailing partial line and return the sections"""
+        if self._buffer:
+            self._feed_line(self._buffer)
+            self._buffer = ""
+        self._flush_section()
+        self._current_section = None
+        return self.sections
+
+
+class AILogAnalyzer:
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
+        if not self.api_key:
+            raise ValueError("Anthropic API key is required. Set ANTHROPIC_API_KEY environment variable or pass it directly.")
+        
+        self.client = Anthropic(api_key=self.api_key)
+    
+    @cached_analysis
+    def analyze_logs(self, logs: Dict, system_info: Dict = None) -> Dict:
+        """Analyze logs using Claude API and return recommendations"""
+
+        # Prepare the context for Claude as content blocks so the stable
+        # system_info prefix can carry its own cache breakpoint
+        content_blocks = self._prepare_context_blocks(logs, system_info)
+
+        try:
+            response = self.client.messages.create(
+                model="claude-3-opus-20240229",
+                max_tokens=4096,
+                temperature=0,
+                system=[{
+                    "type": "text",
+                    "text": SYSTEM_RUBRIC,
+                    # Cache breakpoint at the end of the static rubric, just
+                    # before the dynamic log context
+                    "cache_control": {"type": "ephemeral"}
+                }],
                 messages=[{
                     "role": "user",
-                    "content": context
+                    "content": content_blocks
                 }]
             )
-            
+
+            _log_cache_usage(response)
+
             if not response or not response.content:
                 return {
                     'summary': "No response received from AI analysis",
@@ -84,98 +311,177 @@ class AILogAnalyzer:
                 }
             }
 
+    def analyze_logs_stream(self, logs: Dict, system_info: Dict = None):
+        """Stream the Claude analysis, yielding partial section dicts as the
+        response arrives so callers can show results before the model is
+        done. The final item carries the complete summary and severity."""
+        content_blocks = self._prepare_context_blocks(logs, system_info)
+        parser = SectionStreamParser()
+        received = []
+
+        try:
+            with self.client.messages.stream(
+                model="claude-3-opus-20240229",
+                max_tokens=4096,
+                temperature=0,
+                system=[{
+                    "type": "text",
+                    "text": SYSTEM_RUBRIC,
+                    "cache_control": {"type": "ephemeral"}
+                }],
+                messages=[{
+                    "role": "user",
+                    "content": content_blocks
+                }]
+            ) as stream:
+                for text in stream.text_stream:
+                    received.append(text)
+                    sections_before = len(parser.sections)
+                    parser.feed(text)
+                    # Only surface an update when a section has completed
+                    if len(parser.sections) > sections_before:
+                        yield {
+                            'sections': dict(parser.sections),
+                            'partial': True
+                        }
+
+            content = "".join(received)
+            yield {
+                'summary': content,
+                'severity': self._determine_severity(content),
+                'sections': parser.finish(),
+                'partial': False
+            }
+
+        except Exception as e:
+            yield {
+                'summary': f"AI analysis failed: {str(e)}",
+                'severity': "error",
+                'sections': {
+                    'Critical Issues': [str(e)]
+                },
+                'partial': False
+            }
+
     def _parse_sections(self, content: str) -> Dict[str, List[str]]:
         """Parse the response into sections"""
-        sections = {}
-        current_section = None
-        current_items = []
-        
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check for section headers
-            if line.startswith('===') and line.endswith('==='):
-                if current_section and current_items:
-                    sections[current_section] = current_items
-                current_section = line.strip('= ')
-                current_items = []
-            elif line.startswith(('-', '•', '*', '1.', '2.', '3.')):
-                if current_section:
-                    current_items.append(line.lstrip('-•* 123.').strip())
-            elif current_section and line:
-                current_items.append(line)
-        
-        # Add the last section
-        if current_section and current_items:
-            sections[current_section] = current_items
-            
-        return sections
-
-    def _prepare_json_serializable(self, obj: Union[Dict, List, set, str, int, float, bool, None]) -> Union[Dict, List, str, int, float, bool, None]:
-        """Convert objects to JSON serializable format"""
-        if isinstance(obj, dict):
-            return {k: self._prepare_json_serializable(v) for k, v in obj.items()}
-        elif isinstance(obj, (list, set)):
-            return [self._prepare_json_serializable(v) for v in obj]
-        elif isinstance(obj, (str, int, float, bool, type(None))):
-            return obj
-        return str(obj)
+        # One parser implementation for both the streaming and the
+        # whole-response paths
+        parser = SectionStreamParser()
+        parser.feed(content)
+        return parser.finish()
+
+    def _format_system_info(self, system_info: Dict) -> str:
+        """Format system info with a stable key order so repeat requests
+        stay byte-identical for the prompt cache"""
+        return "\n".join([
+            "System Information:",
+            _dumps_indented(system_info),
+            ""
+        ])
+
+    def _prepare_context_blocks(self, logs: Dict, system_info: Dict = None) -> List[Dict]:
+        """Split the context into content blocks: the stable system_info
+        prefix (with its own cache breakpoint when large enough) followed
+        by the dynamic log tail"""
+        blocks = []
+
+        if system_info:
+            info_text = self._format_system_info(system_info)
+            info_block = {"type": "text", "text": info_text}
+            if len(info_text) >= MIN_CACHEABLE_CHARS:
+                info_block["cache_control"] = {"type": "ephemeral"}
+            blocks.append(info_block)
+
+        blocks.append({"type": "text", "text": self._prepare_context(logs)})
+        return blocks
+
+    def _example_messages(self, messages, limit: int):
+        """Pick up to limit example messages without materializing the whole
+        group, keeping only the first occurrence of each message shape
+        (digits masked) so near-identical repeats don't eat the budget"""
+        seen = {}
+        # Scan a bounded window so huge spam groups stay O(k), not O(N)
+        for msg in islice(messages, 100):
+            key = _NUM_RE.sub('#', msg)
+            if key not in seen:
+                seen[key] = msg
+                if len(seen) == limit:
+                    break
+        return seen.values()
 
     def _prepare_context(self, logs: Dict, system_info: Dict = None) -> str:
         """Prepare log data for AI analysis"""
-        context_parts = []
-        
+        # Write into one growing buffer instead of collecting thousands of
+        # small strings and joining at the end
+        buf = io.StringIO()
+        w = buf.write
+
         # Add system information if available
         if system_info:
-            context_parts.extend([
-                "System Information:",
-                json.dumps(system_info, indent=2),
-                ""
-            ])
-        
+            w(self._format_system_info(system_info))
+            w("\n")
+
         # Add log summary
-        context_parts.extend([
-            "Log Analysis Summary:",
-            f"Total issues found: {sum(logs.get('alerts', {}).values())}",
-            ""
-        ])
-        
-        # Add detailed logs
-        context_parts.append("Detailed Logs:")
-        
+        w("Log Analysis Summary:\n")
+        w(f"Total issues found: {sum(logs.get('alerts', {}).values())}\n\n")
+
+        # Add detailed logs, highest priority first, inside the token
+        # budget: grouped messages are the distilled signal, so unique
+        # messages are the first thing evicted when space runs out
+        w("Detailed Logs:")
+        budget_chars = MAX_CONTEXT_TOKENS * 4
+        truncated = False
+
         if logs.get('grouped_messages'):
             for issue_type, groups in logs['grouped_messages'].items():
                 for group_name, messages in groups.items():
-                    context_parts.append(f"\n{issue_type.upper()} - {group_name}:")
-                    # Limit to first 5 messages per group to avoid overwhelming the AI
-                    for msg in list(messages)[:5]:
-                        context_parts.append(f"  - {msg}")
-        
-        if logs.get('unique_messages'):
+                    if buf.tell() >= budget_chars:
+                        truncated = True
+                        break
+                    w(f"\n\n{issue_type.upper()} - {group_name}:")
+                    # Limit to 5 distinct messages per group to avoid overwhelming the AI
+                    for msg in self._example_messages(messages, 5):
+                        w(f"\n  - {msg}")
+                if truncated:
+                    break
+
+        if logs.get('unique_messages') and not truncated:
             for issue_type, messages in logs['unique_messages'].items():
-                context_parts.append(f"\n{issue_type.upper()} - Unique Messages:")
+                if buf.tell() >= budget_chars:
+                    truncated = True
+                    break
+                w(f"\n\n{issue_type.upper()} - Unique Messages:")
                 for msg in messages:
-                    context_parts.append(f"  - {msg}")
-        
-        return "\n".join(context_parts)
+                    if buf.tell() >= budget_chars:
+                        truncated = True
+                        break
+                    w(f"\n  - {msg}")
+
+        if truncated:
+            w("\n\n[Further log detail omitted to stay within the token budget]")
+
+        return buf.getvalue()
 
     def _determine_severity(self, content: str) -> str:
         """Determine overall severity based on AI response"""
         content_lower = content.lower()
-        
-        if any(word in content_lower for word in [
-            "critical", "immediate attention", "severe", "urgent", "failure",
-            "lost lock", "cluster issue", "ha failure"
-        ]):
-            return "critical"
-        elif any(word in content_lower for word in [
-            "warning", "attention needed", "moderate", "should be addressed"
-        ]):
-            return "warning"
-        elif "healthy" in content_lower or "no significant issues" in content_lower:
-            return "info"
+
+        if _SEVERITY_AUTOMATON is not None:
+            # One linear scan over the content: bail out on the first
+            # critical hit, remember whether any warning keyword appeared
+            saw_warning = False
+            for _, severity in _SEVERITY_AUTOMATON.iter(content_lower):
+                if severity == "critical":
+                    return "critical"
+                saw_warning = True
+            if saw_warning:
+                return "warning"
+        else:
+            if any(word in content_lower for word in CRITICAL_KEYWORDS):
+                return "critical"
+            elif any(word in content_lower for word in WARNING_KEYWORDS):
+                return "warning"
         return "info"
         
 class ChatGPTProvider(AIProvider):
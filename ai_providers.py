@@ -1,12 +1,190 @@
 # ai_providers.py
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import io
 import os
-import json
-from typing import Dict, Optional
+import re
+import httpx
+import orjson
+from itertools import islice
+from typing import Dict, List, Optional
 import google.generativeai as genai
 import openai
+import anthropic
 from anthropic import Anthropic
 from analyzer import LogAnalyzer
+from response_cache import cached_analysis
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+    # Provider latency is long-tailed and 429/5xx responses are transient;
+    # retrying inside the provider keeps the already-built prompt (and its
+    # cached prefix) instead of failing the whole pipeline run.
+    _retry_api_call = retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        retry=retry_if_exception_type((
+            anthropic.RateLimitError,
+            anthropic.APIStatusError,
+            openai.RateLimitError,
+            openai.APIStatusError,
+            httpx.TimeoutException,
+        )),
+        reraise=True,
+    )
+except ImportError:
+    def _retry_api_call(func):
+        return func
+
+CLAUDE_CRITICAL_KEYWORDS = ("critical", "severe", "urgent", "failure", "error")
+CLAUDE_WARNING_KEYWORDS = ("warning", "attention", "caution", "moderate")
+
+GENERIC_CRITICAL_KEYWORDS = ("critical", "urgent", "severe")
+GENERIC_WARNING_KEYWORDS = ("warning", "attention", "moderate")
+
+
+def _build_severity_automaton(tiers):
+    """Compile all keyword tiers into one Aho-Corasick automaton mapping
+    each keyword to its severity, so classification is a single pass"""
+    automaton = ahocorasick.Automaton()
+    for severity, words in tiers:
+        for word in words:
+            automaton.add_word(word, severity)
+    automaton.make_automaton()
+    return automaton
+
+
+def _scan_severity(automaton, content_lower: str) -> str:
+    """One linear scan: bail out on the first critical hit, remember
+    whether any warning keyword appeared"""
+    saw_warning = False
+    for _, severity in automaton.iter(content_lower):
+        if severity == "critical":
+            return "critical"
+        saw_warning = True
+    return "warning" if saw_warning else "info"
+
+
+if ahocorasick is not None:
+    _CLAUDE_SEVERITY_AUTOMATON = _build_severity_automaton((
+        ("critical", CLAUDE_CRITICAL_KEYWORDS),
+        ("warning", CLAUDE_WARNING_KEYWORDS),
+    ))
+    _GENERIC_SEVERITY_AUTOMATON = _build_severity_automaton((
+        ("critical", GENERIC_CRITICAL_KEYWORDS),
+        ("warning", GENERIC_WARNING_KEYWORDS),
+    ))
+else:
+    _CLAUDE_SEVERITY_AUTOMATON = _GENERIC_SEVERITY_AUTOMATON = None
+
+# Hoisted to module level so every request sends byte-identical text --
+# Anthropic's prompt cache only hits on an exact prefix match.
+CLAUDE_SYSTEM_RUBRIC = "You are an expert system administrator analyzing logs. Format your response with these exact sections: === Overall Assessment === (brief overview) === Critical Issues === (list major problems) === Service Issues === (list service problems) === Recommendations === (list actions to take) === Preventive Measures === (list prevention steps)"
+
+CLAUDE_TRIAGE_RUBRIC = "You are an expert system administrator triaging logs. Reply with only the === Overall Assessment === section: one or two sentences on overall system state. Use the word critical only if something needs immediate action."
+
+# Opus is the expensive deep-dive tier; clean-looking bundles get a Haiku
+# triage pass first and only escalate when it flags something critical.
+CLAUDE_DEEP_MODEL = "claude-3-opus-20240229"
+CLAUDE_TRIAGE_MODEL = "claude-3-5-haiku-latest"
+
+# Heuristic ~4 chars/token; Anthropic ignores cache breakpoints on prefixes
+# shorter than 1024 tokens, so marking small blocks is pointless.
+MIN_CACHEABLE_CHARS = 1024 * 4
+
+
+def _json_default(obj):
+    """Fallback for types orjson can't serialize natively.
+
+    Sets are sorted so the output stays byte-stable for the prompt cache.
+    """
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    return str(obj)
+
+
+def _dumps_indented(obj) -> str:
+    """Serialize with stable key order so repeat prompts stay byte-identical"""
+    return orjson.dumps(
+        obj,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        default=_json_default
+    ).decode()
+
+
+# Bundles marshaled into a single API call by analyze_logs_batch. Larger
+# batches amortize round-trip latency further but push per-call latency up.
+BATCH_SIZE = 4
+
+_BUNDLE_RESULT_RE = re.compile(r'===\s*BUNDLE\s+(\d+)\s+RESULT\s*===')
+
+# Constant fragments for the per-message hot loops in _prepare_data: writing
+# prebuilt bytes avoids formatting a fresh f-string per log message.
+_EXAMPLE_PREFIX = b"\nExample: "
+_GROUP_HEADER = b"\n\n%s Groups:"
+_GROUP_COUNT = b"\n\n%s: %d occurrences"
+
+
+def _build_batch_prompt(prompts: List[str]) -> str:
+    """Marshal several per-bundle prompts into one numbered mega-prompt"""
+    parts = [
+        "Analyze each of the following log bundles independently.",
+        "For every bundle, start your answer with a line of the form",
+        "=== BUNDLE <number> RESULT ===",
+        "followed by the usual sections for that bundle."
+    ]
+    for i, prompt in enumerate(prompts, 1):
+        parts.append(f"\n=== BUNDLE {i} ===\n{prompt}")
+    return "\n".join(parts)
+
+
+def _split_batch_response(content: str, count: int) -> List[str]:
+    """Split a batched response back into one block per bundle"""
+    pieces = _BUNDLE_RESULT_RE.split(content)
+    # split() with a capture group yields [preamble, '1', block1, '2', ...]
+    results = [''] * count
+    for number, block in zip(pieces[1::2], pieces[2::2]):
+        index = int(number) - 1
+        if 0 <= index < count:
+            results[index] = block.strip()
+    return results
+
+
+def _log_cache_usage(response):
+    """Print prompt-cache hit/miss counters when the API reports them"""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    read = getattr(usage, 'cache_read_input_tokens', None)
+    created = getattr(usage, 'cache_creation_input_tokens', None)
+    if read or created:
+        print(f"Prompt cache: {read or 0} tokens read, {created or 0} tokens created")
+
+
+# One keep-alive connection pool shared by every provider SDK. Reusing a
+# warm TLS connection saves a handshake per call, and HTTP/2 lets parallel
+# provider requests multiplex over the same connection.
+_shared_http_client = None
+
+
+def _get_http_client() -> httpx.Client:
+    global _shared_http_client
+    if _shared_http_client is None:
+        limits = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60)
+        try:
+            _shared_http_client = httpx.Client(http2=True, timeout=120.0, limits=limits)
+        except ImportError:
+            # http2 support needs the optional h2 package
+            _shared_http_client = httpx.Client(timeout=120.0, limits=limits)
+    return _shared_http_client
+
 
 class AIProvider(ABC):
     """Base class for AI providers"""
@@ -19,50 +197,117 @@ class ClaudeProvider(AIProvider):
         self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
         if not self.api_key:
             raise ValueError("Claude API key is required. Set ANTHROPIC_API_KEY environment variable or pass it directly.")
-        self.client = Anthropic(api_key=self.api_key)
+        self.client = Anthropic(api_key=self.api_key, http_client=_get_http_client())
 
     def _prepare_prompt(self, logs: Dict, system_info: Optional[Dict] = None) -> str:
         """Prepare the prompt for Claude"""
-        parts = ["Please analyze these system logs:"]
-        
+        # Write into one growing buffer instead of collecting thousands of
+        # small strings and joining at the end
+        buf = io.StringIO()
+        w = buf.write
+        w("Please analyze these system logs:")
+
         # Add basic statistics
         stats = logs.get('stats', {})
-        parts.append(f"\nStatistics:")
-        parts.append(f"Total lines processed: {stats.get('total_lines', 0)}")
-        parts.append(f"Total matches found: {stats.get('total_matches', 0)}")
-        
+        w("\n\nStatistics:")
+        w(f"\nTotal lines processed: {stats.get('total_lines', 0)}")
+        w(f"\nTotal matches found: {stats.get('total_matches', 0)}")
+
         # Add grouped messages
         grouped = logs.get('grouped_messages', {})
         for issue_type, groups in grouped.items():
-            parts.append(f"\n{issue_type.upper()} Groups:")
+            w(f"\n\n{issue_type.upper()} Groups:")
             for group_name, messages in groups.items():
-                parts.append(f"\n{group_name}: {len(messages)} occurrences")
-                # Add up to 3 examples
-                for msg in list(messages)[:3]:
-                    parts.append(f"Example: {msg}")
-        
+                w(f"\n\n{group_name}: {len(messages)} occurrences")
+                # Add up to 3 examples without materializing the whole group
+                for msg in islice(messages, 3):
+                    w(f"\nExample: {msg}")
+
         # Add system info if provided
         if system_info:
-            parts.append("\nSystem Information:")
-            parts.append(json.dumps(system_info, indent=2))
-        
-        return "\n".join(parts)
+            w("\n\nSystem Information:\n")
+            w(_dumps_indented(system_info))
 
-    def analyze_logs(self, logs: Dict, system_info: Optional[Dict] = None) -> Dict:
+        return buf.getvalue()
+
+    def _prepare_prompt_blocks(self, logs: Dict, system_info: Optional[Dict] = None) -> list:
+        """Split the prompt into content blocks, leading with the stable
+        system_info prefix so it can carry its own cache breakpoint"""
+        blocks = []
+
+        if system_info:
+            # Stable key order keeps repeat requests byte-identical for
+            # the prompt cache
+            info_text = "System Information:\n" + _dumps_indented(system_info)
+            info_block = {"type": "text", "text": info_text}
+            if len(info_text) >= MIN_CACHEABLE_CHARS:
+                info_block["cache_control"] = {"type": "ephemeral"}
+            blocks.append(info_block)
+
+        blocks.append({"type": "text", "text": self._prepare_prompt(logs)})
+        return blocks
+
+    @_retry_api_call
+    def _create_message(self, content, model: str = CLAUDE_DEEP_MODEL,
+                        system_text: str = CLAUDE_SYSTEM_RUBRIC,
+                        max_tokens: int = 4096):
+        """Issue one Claude API call; retried on transient rate-limit,
+        server and timeout errors"""
+        return self.client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0,
+            system=[{
+                "type": "text",
+                "text": system_text,
+                # Cache breakpoint at the end of the static rubric, just
+                # before the dynamic log prompt
+                "cache_control": {"type": "ephemeral"}
+            }],
+            messages=[{
+                "role": "user",
+                "content": content
+            }]
+        )
+
+    def _triage(self, content_blocks) -> Optional[Dict]:
+        """Cheap Haiku pre-pass returning just an overall assessment, or
+        None when triage itself fails so the deep model still runs"""
         try:
-            prompt = self._prepare_prompt(logs, system_info)
-            
-            response = self.client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=4096,
-                temperature=0,
-                system="You are an expert system administrator analyzing logs. Format your response with these exact sections: === Overall Assessment === (brief overview) === Critical Issues === (list major problems) === Service Issues === (list service problems) === Recommendations === (list actions to take) === Preventive Measures === (list prevention steps)",
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
+            response = self._create_message(
+                content_blocks,
+                model=CLAUDE_TRIAGE_MODEL,
+                system_text=CLAUDE_TRIAGE_RUBRIC,
+                max_tokens=256
             )
-            
+            if not response or not response.content:
+                return None
+
+            content = str(response.content)
+            return {
+                'summary': content,
+                'severity': self._determine_severity(content)
+            }
+        except Exception:
+            return None
+
+    @cached_analysis
+    def analyze_logs(self, logs: Dict, system_info: Optional[Dict] = None) -> Dict:
+        try:
+            content_blocks = self._prepare_prompt_blocks(logs, system_info)
+
+            # Bundles with no alerts rarely need the expensive tier: triage
+            # with Haiku first and only escalate to Opus when it still
+            # flags something critical
+            if sum(logs.get('alerts', {}).values()) == 0:
+                triage = self._triage(content_blocks)
+                if triage is not None and triage['severity'] != 'critical':
+                    return triage
+
+            response = self._create_message(content_blocks)
+
+            _log_cache_usage(response)
+
             if not response or not response.content:
                 raise ValueError("No response received from Claude")
             
@@ -77,15 +322,45 @@ class ClaudeProvider(AIProvider):
         except Exception as e:
             raise RuntimeError(f"Error with Claude: {str(e)}")
 
+    def analyze_logs_batch(self, bundles: List[Dict], system_info: Optional[Dict] = None,
+                           batch_size: int = BATCH_SIZE) -> List[Dict]:
+        """Analyze several independent log bundles, marshaling batch_size
+        bundles into each API call to amortize round-trip latency and
+        rate-limit quota"""
+        results = []
+        for start in range(0, len(bundles), batch_size):
+            chunk = bundles[start:start + batch_size]
+            prompts = [self._prepare_prompt(bundle) for bundle in chunk]
+            try:
+                response = self._create_message(_build_batch_prompt(prompts))
+
+                if not response or not response.content:
+                    raise ValueError("No response received from Claude")
+
+                content = str(response.content)
+                for piece in _split_batch_response(content, len(chunk)):
+                    results.append({
+                        'summary': piece,
+                        'severity': self._determine_severity(piece)
+                    })
+            except Exception as e:
+                results.extend({
+                    'summary': f"AI analysis failed: {str(e)}",
+                    'severity': 'error'
+                } for _ in chunk)
+        return results
+
     def _determine_severity(self, content: str) -> str:
         """Determine severity based on content"""
         content = content.lower()
-        if any(word in content for word in ["critical", "severe", "urgent", "failure", "error"]):
+        if _CLAUDE_SEVERITY_AUTOMATON is not None:
+            return _scan_severity(_CLAUDE_SEVERITY_AUTOMATON, content)
+        if any(word in content for word in CLAUDE_CRITICAL_KEYWORDS):
             return "critical"
-        elif any(word in content for word in ["warning", "attention", "caution", "moderate"]):
+        elif any(word in content for word in CLAUDE_WARNING_KEYWORDS):
             return "warning"
         return "info"
-        
+
 class GeminiProvider(AIProvider):
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
@@ -94,6 +369,7 @@ class GeminiProvider(AIProvider):
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-pro')
 
+    @cached_analysis
     def analyze_logs(self, logs: Dict, system_info: Optional[Dict] = None) -> Dict:
         try:
             prompt = self._prepare_prompt(logs, system_info)
@@ -121,25 +397,46 @@ class GeminiProvider(AIProvider):
                  
     def _prepare_data(self, logs: Dict) -> str:
         """Reduce data size by limiting examples"""
-        summary = []
-        summary.append("Log Analysis Summary:")
-    
+        buf = io.BytesIO()
+        w = buf.write
+        w(b"Log Analysis Summary:")
+
         # Add statistics
         stats = logs.get('stats', {})
-        summary.append(f"Total lines processed: {stats.get('total_lines', 0)}")
-        summary.append(f"Total matches found: {stats.get('total_matches', 0)}\n")
-    
+        w(f"\nTotal lines processed: {stats.get('total_lines', 0)}".encode())
+        w(f"\nTotal matches found: {stats.get('total_matches', 0)}\n".encode())
+
         # Add grouped messages with limited examples
         grouped = logs.get('grouped_messages', {})
         for issue_type, groups in grouped.items():
-            summary.append(f"\n{issue_type.upper()} Groups:")
+            w(_GROUP_HEADER % issue_type.upper().encode())
             for group_name, messages in groups.items():
-                count = len(messages)
-                summary.append(f"\n{group_name}: {count} occurrences")
+                w(_GROUP_COUNT % (group_name.encode(), len(messages)))
                 for msg in messages[:self.max_examples]:
-                    summary.append(f"Example: {msg}")
-    
-        return "\n".join(summary)
+                    w(_EXAMPLE_PREFIX)
+                    w(msg.encode())
+
+        return buf.getvalue().decode()
+
+    def analyze_logs_batch(self, bundles: List[Dict], system_info: Optional[Dict] = None,
+                           batch_size: int = BATCH_SIZE) -> List[Dict]:
+        """Analyze several independent log bundles, marshaling batch_size
+        bundles into each API call to amortize round-trip latency and
+        rate-limit quota"""
+        results = []
+        for start in range(0, len(bundles), batch_size):
+            chunk = bundles[start:start + batch_size]
+            prompts = [self._prepare_prompt(bundle) for bundle in chunk]
+            try:
+                response = self.model.generate_content(_build_batch_prompt(prompts))
+                for piece in _split_batch_response(response.text, len(chunk)):
+                    results.append(self._parse_response(piece))
+            except Exception as e:
+                results.extend({
+                    'summary': f"AI analysis failed: {str(e)}",
+                    'severity': 'error'
+                } for _ in chunk)
+        return results
 
     def _parse_response(self, content: str) -> Dict:
         """Parse the AI response into a structured format"""
@@ -151,39 +448,71 @@ class GeminiProvider(AIProvider):
     def _determine_severity(self, content: str) -> str:
         """Determine severity based on content"""
         content_lower = content.lower()
-        if any(word in content_lower for word in ["critical", "urgent", "severe"]):
+        if _GENERIC_SEVERITY_AUTOMATON is not None:
+            return _scan_severity(_GENERIC_SEVERITY_AUTOMATON, content_lower)
+        if any(word in content_lower for word in GENERIC_CRITICAL_KEYWORDS):
             return "critical"
-        elif any(word in content_lower for word in ["warning", "attention", "moderate"]):
+        elif any(word in content_lower for word in GENERIC_WARNING_KEYWORDS):
             return "warning"
-        return "info"    
-                 
+        return "info"
+
+
 class ChatGPTProvider(AIProvider):
     def __init__(self, api_key: str = None, max_examples: int = 3):
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         self.max_examples = max_examples
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass it directly.")
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.client = openai.OpenAI(api_key=self.api_key, http_client=_get_http_client())
+
+    @_retry_api_call
+    def _create_completion(self, user_content: str):
+        """Issue one ChatGPT API call; retried on transient rate-limit,
+        server and timeout errors"""
+        return self.client.chat.completions.create(
+            model="gpt-3.5-turbo",  # or "gpt-3.5-turbo" for faster/cheaper analysis
+            messages=[
+                {"role": "system", "content": """You are an expert system administrator analyzing logs.
+                    Provide analysis in the following format:
+                    === Overall Assessment ===
+                    === Critical Issues ===
+                    === Service Issues ===
+                    === Recommendations ===
+                    === Preventive Measures ==="""},
+                {"role": "user", "content": user_content}
+            ],
+            temperature=0
+        )
 
+    @cached_analysis
     def analyze_logs(self, logs: Dict, system_info: Optional[Dict] = None) -> Dict:
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # or "gpt-3.5-turbo" for faster/cheaper analysis
-                messages=[
-                    {"role": "system", "content": """You are an expert system administrator analyzing logs.
-                        Provide analysis in the following format:
-                        === Overall Assessment ===
-                        === Critical Issues ===
-                        === Service Issues ===
-                        === Recommendations ===
-                        === Preventive Measures ==="""},
-                    {"role": "user", "content": f"Analyze these logs:\n{logs}"}
-                ],
-                temperature=0
-            )
+            response = self._create_completion(f"Analyze these logs:\n{logs}")
             return self._parse_response(response.choices[0].message.content)
         except Exception as e:
             raise RuntimeError(f"Error with ChatGPT: {str(e)}")
+
+    def analyze_logs_batch(self, bundles: List[Dict], system_info: Optional[Dict] = None,
+                           batch_size: int = BATCH_SIZE) -> List[Dict]:
+        """Analyze several independent log bundles, marshaling batch_size
+        bundles into each API call to amortize round-trip latency and
+        rate-limit quota"""
+        results = []
+        for start in range(0, len(bundles), batch_size):
+            chunk = bundles[start:start + batch_size]
+            prompts = [str(bundle) for bundle in chunk]
+            try:
+                response = self._create_completion(_build_batch_prompt(prompts))
+                content = response.choices[0].message.content
+                for piece in _split_batch_response(content, len(chunk)):
+                    results.append(self._parse_response(piece))
+            except Exception as e:
+                results.extend({
+                    'summary': f"AI analysis failed: {str(e)}",
+                    'severity': 'error'
+                } for _ in chunk)
+        return results
+
     def _parse_response(self, content: str) -> Dict:
         return {
             'summary': content,
@@ -192,14 +521,48 @@ class ChatGPTProvider(AIProvider):
 
     def _determine_severity(self, content: str) -> str:
         content_lower = content.lower()
-        if any(word in content_lower for word in ["critical", "urgent", "severe"]):
+        if _GENERIC_SEVERITY_AUTOMATON is not None:
+            return _scan_severity(_GENERIC_SEVERITY_AUTOMATON, content_lower)
+        if any(word in content_lower for word in GENERIC_CRITICAL_KEYWORDS):
             return "critical"
-        elif any(word in content_lower for word in ["warning", "attention", "moderate"]):
+        elif any(word in content_lower for word in GENERIC_WARNING_KEYWORDS):
             return "warning"
         return "info"
 
+def analyze_with_all(providers: Dict[str, AIProvider], logs: Dict,
+                     system_info: Optional[Dict] = None) -> Dict[str, Dict]:
+    """Run analyze_logs on every provider in parallel.
+
+    API latency dominates these calls, so fanning them out across threads
+    drops wall-clock time from the sum of latencies to the slowest single
+    call. A failing provider is reported as an error result instead of
+    aborting the whole comparison.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(providers)) as pool:
+        futures = {
+            name: pool.submit(provider.analyze_logs, logs, system_info)
+            for name, provider in providers.items()
+        }
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = {
+                    'summary': f"AI analysis failed: {str(e)}",
+                    'severity': 'error'
+                }
+    return results
+
+
+@functools.lru_cache(maxsize=8)
 def get_ai_provider(provider_name: str, api_key: str = None) -> AIProvider:
-    """Factory function to get the appropriate AI provider"""
+    """Factory function to get the appropriate AI provider.
+
+    Memoized per (provider, key) so repeated calls reuse the same SDK
+    client -- and with it the shared HTTP connection pool -- instead of
+    rebuilding httpx clients and credential state each time.
+    """
     providers = {
         'claude': ClaudeProvider,
         'gemini': GeminiProvider,
@@ -1,13 +1,102 @@
 # analyzer.py
+import bisect
+import multiprocessing
+import os
 import re
+import sys
 from datetime import datetime
 from collections import defaultdict
+from itertools import islice
 from colorama import init, Fore, Style
 import json
 
+try:
+    # Optional: Hyperscan (pip install hyperscan) bulk-scans all level
+    # patterns in one SIMD pass, used as a prefilter in run()
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    # Optional: Google RE2 (pip install google-re2) scans in guaranteed
+    # linear time, which matters for the JSON-ish ignore patterns on
+    # long lines; all our scan patterns are plain regular expressions
+    import re2 as _re
+except ImportError:
+    _re = re
+
+
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+
+def _compile(pattern, flags=0):
+    """Compile with RE2 when available, falling back to re for syntax
+    RE2 rejects (lookarounds, backreferences). RE2's compile takes no
+    flags argument, so IGNORECASE is translated to an inline (?i)."""
+    if '(?!' in pattern or '(?=' in pattern or '(?<' in pattern:
+        return re.compile(pattern, flags)
+    try:
+        if flags & re.IGNORECASE:
+            return _re.compile('(?i)' + pattern)
+        return _re.compile(pattern)
+    except Exception:
+        return re.compile(pattern, flags)
+
+
 # Initialize colorama for cross-platform colored output
 init()
 
+# Compiled once at import: these run on every matched line, and calling
+# re.search/re.sub with pattern strings pays a cache lookup per call.
+# The summary substitutions are one alternation so a single sub pass
+# replaces all the variable parts; lastgroup picks the token.
+_SUMMARY_RE = _compile(
+    r'(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+[-+]\d{4})'
+    r'|(?P<pid>\[\d+\])'
+    r'|(?P<op>Operation [A-F0-9-]+)'
+    r'|(?P<code>error \d+)')
+_SUMMARY_TOKENS = {'ts': 'TIMESTAMP', 'pid': '[PID]',
+                   'op': 'Operation ID', 'code': 'error CODE'}
+
+
+def _summary_replace(m):
+    return _SUMMARY_TOKENS[m.lastgroup]
+
+
+_CLEAN_TS_RE = _compile(r'\s+\[\d{2}:\d{2}:\d{2}.*?\](?!$)')
+
+# Fallback group keys ("process_<name>") interned once per process name
+# instead of re-formatted for every matched line
+_PROCESS_KEY_CACHE = {}
+
+# Batches above this size are split across CPU cores in run()
+_PARALLEL_THRESHOLD = 20000
+
+# Lines pulled from a streaming collector per analysis batch
+_STREAM_BATCH = 10000
+
+
+def _analyze_chunk(args):
+    """Pool worker: analyze a slice of lines with a fresh LogAnalyzer and
+    return plain-dict counters so the parent can merge them. Top-level so
+    it is picklable."""
+    chunk, show_levels = args
+    worker = LogAnalyzer(use_color=False, show_levels=show_levels)
+    worker.analyze_lines(chunk)
+    grouped = {
+        level: {group: list(msgs) for group, msgs in groups.items()}
+        for level, groups in worker.grouped_messages.items()
+    }
+    return (dict(worker.alerts), grouped,
+            worker.total_lines_processed, worker.total_matches)
+
 class LogAnalyzer:
     def __init__(self, use_color=True, output_file=None, output_json=False, 
                  show_full=False, debug=False, show_levels=None):
@@ -17,7 +106,20 @@ class LogAnalyzer:
         self.show_full = show_full
         self.debug = debug
         self.show_levels = show_levels or {'error', 'warning', 'info'}
-        
+
+        # Color escapes resolved once here; when color is off they are
+        # empty strings so formatting needs no per-line branch
+        if use_color:
+            self._c_err = Fore.RED
+            self._c_warn = Fore.YELLOW
+            self._c_info = Fore.BLUE
+            self._c_ok = Fore.GREEN
+            self._c_cyan = Fore.CYAN
+            self._c_reset = Style.RESET_ALL
+        else:
+            self._c_err = self._c_warn = self._c_info = ''
+            self._c_ok = self._c_cyan = self._c_reset = ''
+
         # Enhanced patterns with better filtering
         self.patterns = {
             'error': {
@@ -74,13 +176,68 @@ class LogAnalyzer:
             }
         }
         
+        # Pre-compile every pattern once; analyze_line runs them per log
+        # line and per-call compilation cache lookups add up over millions
+        # of lines. The ignore list and group dict for each level are fused
+        # into single alternations so one search covers all of them and
+        # m.lastgroup tells us which group fired.
+        self._compiled = {}
+        for level, config in self.patterns.items():
+            ignore_re = None
+            if config['ignore']:
+                ignore_re = _compile(
+                    '|'.join(f'(?:{p})' for p in config['ignore']),
+                    re.IGNORECASE)
+            group_re = _compile(
+                '|'.join(f'(?P<{name}>{pat})'
+                         for name, pat in config['group'].items()),
+                re.IGNORECASE)
+            self._compiled[level] = {
+                'pattern': _compile(config['pattern'], re.IGNORECASE),
+                'ignore': ignore_re,
+                'group': group_re,
+            }
+
+        # Union of the top-level patterns for the levels we actually show:
+        # most lines match nothing, so one search rejects them instead of
+        # one per level. m.lastgroup names the level that fired.
+        self._any_level_re = _compile(
+            '|'.join(
+                f"(?P<{level}>{config['pattern'].removeprefix('(?i)')})"
+                for level, config in self.patterns.items()
+                if level in self.show_levels) or r'(?!)',
+            re.IGNORECASE)
+
+        # Optional Hyperscan prefilter over the same level patterns:
+        # most lines are rejects, and one vectorized scan over the whole
+        # batch is far cheaper than per-line Python regex calls
+        self._hs_db = None
+        if hyperscan is not None:
+            expressions = [
+                config['pattern'].removeprefix('(?i)').encode()
+                for level, config in self.patterns.items()
+                if level in self.show_levels
+            ]
+            if expressions:
+                try:
+                    db = hyperscan.Database()
+                    db.compile(
+                        expressions=expressions,
+                        ids=list(range(len(expressions))),
+                        flags=[hyperscan.HS_FLAG_CASELESS] * len(expressions))
+                    self._hs_db = db
+                except Exception:
+                    self._hs_db = None
+
         self.reset_counters()
 
     def reset_counters(self):
         """Reset all counters and storage"""
         self.alerts = defaultdict(int)
         self.unique_messages = defaultdict(set)
-        self.grouped_messages = defaultdict(lambda: defaultdict(list))
+        # Inner dicts give O(1) dedup membership while keeping insertion
+        # order for display; values are unused
+        self.grouped_messages = defaultdict(lambda: defaultdict(dict))
         self.total_lines_processed = 0
         self.total_matches = 0
 
@@ -91,72 +248,148 @@ class LogAnalyzer:
 
         self.total_lines_processed += 1
 
-        # Extract process name for better grouping
-        process_match = re.search(r'\s(\w+)\[\d+\]:', line)
-        process_name = process_match.group(1) if process_match else 'unknown'
+        # One union search rejects the common no-match line; only a hit
+        # pays for process-name extraction and the per-level logic below
+        level_match = self._any_level_re.search(line)
+        if level_match is None:
+            return
 
-        matched = False
-        for issue_type, config in self.patterns.items():
-            if issue_type not in self.show_levels:
+        self._process_match(line, level_match.lastgroup)
+
+    def analyze_lines(self, lines):
+        """Analyze a batch of lines in one pass. Joining the batch and
+        letting finditer walk it keeps the iteration in C instead of a
+        Python function call per line."""
+        if not isinstance(lines, list):
+            lines = list(lines)
+        if self._hs_db is not None:
+            lines = self._prefilter_lines(lines)
+
+        self.total_lines_processed += sum(1 for line in lines if line.strip())
+
+        buf = '\n'.join(lines)
+        line_end = -1
+        for m in self._any_level_re.finditer(buf):
+            if m.start() <= line_end:
+                # Another hit on a line we already processed
                 continue
+            start = buf.rfind('\n', 0, m.start()) + 1
+            line_end = buf.find('\n', m.end())
+            if line_end == -1:
+                line_end = len(buf)
+            self._process_match(buf[start:line_end], m.lastgroup)
+
+    def _process_match(self, line, issue_type):
+        """Classify a line that already hit a level pattern"""
+        config = self._compiled[issue_type]
+
+        # Extract process name for better grouping. Plain str.find/rfind
+        # (CPython's vectorized substring search) beats a regex pass for
+        # the fixed 'name[pid]:' shape, and this only runs on hit lines.
+        process_name = 'unknown'
+        j = line.find(']:')
+        if j != -1:
+            i = line.rfind('[', 0, j)
+            k = line.rfind(' ', 0, i)
+            if i > k >= 0 and line[i + 1:j].isdigit():
+                candidate = line[k + 1:i]
+                if candidate.isidentifier():
+                    process_name = candidate
+
+        # Check ignore patterns (single fused alternation)
+        if config['ignore'] and config['ignore'].search(line):
+            if self.debug:
+                print(f"DEBUG: Ignoring line from process {process_name}")
+            return
+
+        matched = False
+        # Check group patterns; lastgroup names the alternative hit
+        group_match = config['group'].search(line)
+        if group_match:
+            group_name = group_match.lastgroup
+            # Create a summary of the error; interned because summaries
+            # repeat massively, so dedup hits become pointer compares
+            summary = sys.intern(self._create_error_summary(line, process_name))
+            if summary not in self.grouped_messages[issue_type][group_name]:
+                self.grouped_messages[issue_type][group_name][summary] = None
+                matched = True
+            if self.debug:
+                print(f"DEBUG: Added to group '{group_name}':\n{line}")
+        else:
+            # If not grouped by pattern, group by process
+            summary = sys.intern(self._create_error_summary(line, process_name))
+            process_group = _PROCESS_KEY_CACHE.setdefault(
+                process_name, f"process_{process_name}")
+            if summary not in self.grouped_messages[issue_type][process_group]:
+                self.grouped_messages[issue_type][process_group][summary] = None
+                matched = True
+                if self.debug:
+                    print(f"DEBUG: Added as unique {issue_type}:\n{line}")
+
+        if matched:
+            self.alerts[issue_type] += 1
+            self.total_matches += 1
 
-            if re.search(config['pattern'], line, re.IGNORECASE):
-                # Check ignore patterns
-                should_ignore = False
-                for ignore in config['ignore']:
-                    if re.search(ignore, line, re.IGNORECASE):
-                        if self.debug:
-                            print(f"DEBUG: Ignoring line from process {process_name}")
-                        should_ignore = True
-                        break
-                
-                if should_ignore:
-                    continue
-
-                # Check group patterns
-                grouped = False
-                for group_name, pattern in config['group'].items():
-                    if re.search(pattern, line, re.IGNORECASE):
-                        # Create a summary of the error
-                        summary = self._create_error_summary(line, process_name)
-                        if summary not in self.grouped_messages[issue_type][group_name]:
-                            self.grouped_messages[issue_type][group_name].append(summary)
-                            matched = True
-                        grouped = True
-                        if self.debug:
-                            print(f"DEBUG: Added to group '{group_name}':\n{line}")
-                        break
-                
-                # If not grouped by pattern, group by process
-                if not grouped:
-                    summary = self._create_error_summary(line, process_name)
-                    process_group = f"process_{process_name}"
-                    if summary not in self.grouped_messages[issue_type][process_group]:
-                        self.grouped_messages[issue_type][process_group].append(summary)
-                        matched = True
-                        if self.debug:
-                            print(f"DEBUG: Added as unique {issue_type}:\n{line}")
-
-                if matched:
-                    self.alerts[issue_type] += 1
-                    self.total_matches += 1
+    def _prefilter_lines(self, lines):
+        """Bulk-scan a batch of lines with Hyperscan and keep only those
+        hitting a level pattern; rejected lines still count as processed"""
+        starts = []
+        chunks = []
+        pos = 0
+        for line in lines:
+            encoded = line.encode('utf-8', 'replace')
+            starts.append(pos)
+            chunks.append(encoded)
+            pos += len(encoded) + 1
+        buf = b'\n'.join(chunks)
+
+        hits = set()
+
+        def on_match(_id, _start, end, _flags, _ctx=None):
+            # Map the match end offset back to its line index
+            hits.add(bisect.bisect_right(starts, end - 1) - 1)
+
+        self._hs_db.scan(buf, match_event_handler=on_match)
+
+        kept = []
+        for i, line in enumerate(lines):
+            if i in hits:
+                kept.append(line)
+            elif line.strip():
+                self.total_lines_processed += 1
+        return kept
+
+    def _analyze_parallel(self, logs):
+        """Split a large batch across CPU cores and merge the per-worker
+        counters back into this analyzer"""
+        workers = os.cpu_count() or 1
+        chunk_size = -(-len(logs) // workers)
+        chunks = [(logs[i:i + chunk_size], self.show_levels)
+                  for i in range(0, len(logs), chunk_size)]
+
+        with multiprocessing.Pool(len(chunks)) as pool:
+            results = pool.map(_analyze_chunk, chunks)
+
+        for alerts, grouped, lines_processed, matches in results:
+            for level, count in alerts.items():
+                self.alerts[level] += count
+            for level, groups in grouped.items():
+                for group_name, msgs in groups.items():
+                    dest = self.grouped_messages[level][group_name]
+                    for msg in msgs:
+                        dest[msg] = None
+            self.total_lines_processed += lines_processed
+            self.total_matches += matches
 
     def _create_error_summary(self, line: str, process_name: str) -> str:
-        """Create a summary of the error message, removing variable parts"""
-        # Remove timestamp
-        line = re.sub(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+[-+]\d{4}', 'TIMESTAMP', line)
-        # Remove process IDs
-        line = re.sub(r'\[\d+\]', '[PID]', line)
-        # Remove operation IDs (common in CloudKit errors)
-        line = re.sub(r'Operation [A-F0-9-]+', 'Operation ID', line)
-        # Remove specific error codes
-        line = re.sub(r'error \d+', 'error CODE', line)
-        return line
+        """Create a summary of the error message, removing variable parts
+        (timestamps, PIDs, operation IDs, error codes) in one sub pass"""
+        return _SUMMARY_RE.sub(_summary_replace, line)
 
     def clean_message(self, message):
         """Clean message for display"""
         # Remove timestamps in square brackets that appear in the middle of the message
-        message = re.sub(r'\s+\[\d{2}:\d{2}:\d{2}.*?\](?!$)', ' ', message)
+        message = _CLEAN_TS_RE.sub(' ', message)
         # Only truncate if show_full is False and message is too long
         if not self.show_full and len(message) > 120:
             return message[:117] + "..."
@@ -164,57 +397,58 @@ class LogAnalyzer:
 
     def format_output(self):
         """Format the analysis results"""
-        output = []
-        
+        level_color = {'error': self._c_err, 'warning': self._c_warn,
+                       'info': self._c_info}
+        reset = self._c_reset
+
         # Header with stats
-        output.append("\n" + "="*50)
-        output.append(f"{Fore.GREEN}Log Analysis Results{Style.RESET_ALL}")
-        output.append("="*50)
-        
+        output = [
+            "\n" + "=" * 50,
+            f"{self._c_ok}Log Analysis Results{reset}",
+            "=" * 50,
+        ]
+
         # Add active filters to output if not showing everything
         if self.show_levels != {'error', 'warning', 'info'}:
-            output.append(f"\n{Fore.CYAN}Active Filters:{Style.RESET_ALL}")
+            output.append(f"\n{self._c_cyan}Active Filters:{reset}")
             output.append(f"Showing only: {', '.join(sorted(self.show_levels))}")
-        
+
         output.append(f"\nTotal lines processed: {self.total_lines_processed}")
         output.append(f"Total matches found: {self.total_matches}\n")
-        
+
         # Grouped messages
         for issue_type, groups in self.grouped_messages.items():
             if issue_type not in self.show_levels:
                 continue
-                
+
             for group_name, messages in groups.items():
                 if messages:
                     count = len(messages)
-                    output.append(f"\n{Fore.YELLOW}[{issue_type.upper()}] {group_name}: {count} occurrence(s){Style.RESET_ALL}")
+                    output.append(f"\n{self._c_warn}[{issue_type.upper()}] {group_name}: {count} occurrence(s){reset}")
                     if self.show_full:
                         output.append("Messages:")
-                        for msg in messages:
-                            output.append(f"  {self.clean_message(msg)}")
+                        output.extend(f"  {self.clean_message(msg)}"
+                                      for msg in messages)
                     else:
-                        output.append(f"Example: {self.clean_message(messages[0])}")
+                        output.append(f"Example: {self.clean_message(next(iter(messages)))}")
 
         # Unique messages
         for issue_type, messages in self.unique_messages.items():
             if issue_type not in self.show_levels:
                 continue
-                
-            for msg in messages:
-                output.append(self.colorize(f"[{issue_type.upper()}] {self.clean_message(msg)}", 
-                    Fore.RED if issue_type == 'error' else 
-                    Fore.YELLOW if issue_type == 'warning' else 
-                    Fore.BLUE))
+
+            color = level_color.get(issue_type, self._c_info)
+            output.extend(
+                f"{color}[{issue_type.upper()}] {self.clean_message(msg)}{reset}"
+                for msg in messages)
 
         # Summary
-        output.append("\n" + self.colorize("=== Summary ===", Fore.GREEN))
-        for issue_type, count in sorted(self.alerts.items()):
-            if issue_type not in self.show_levels:
-                continue
-                
-            color = Fore.RED if issue_type == 'error' else Fore.YELLOW if issue_type == 'warning' else Fore.BLUE
-            output.append(self.colorize(f"{issue_type}: {count} total issues", color))
-            
+        output.append(f"\n{self._c_ok}=== Summary ==={reset}")
+        output.extend(
+            f"{level_color.get(issue_type, self._c_info)}{issue_type}: {count} total issues{reset}"
+            for issue_type, count in sorted(self.alerts.items())
+            if issue_type in self.show_levels)
+
         if self.show_full:
             output.append("\nNote: Showing full messages (--full flag is enabled)")
 
@@ -227,50 +461,73 @@ class LogAnalyzer:
         return text
 
     def get_results(self, summarize: bool = False) -> dict:
-        """Get the analysis results"""
-        if summarize:
-            # Return summarized log data
-            return {
-                'alerts': dict(self.alerts),
-                'grouped_messages': dict(self.grouped_messages),
-                'unique_messages': dict(self.unique_messages),
-                'stats': {
-                    'total_lines': self.total_lines_processed,
-                    'total_matches': self.total_matches
-                }
-            }
-        else:
-            # Return raw log data
-            return {
-                'alerts': dict(self.alerts),
-                'grouped_messages': dict(self.grouped_messages),
-                'unique_messages': dict(self.unique_messages),
-                'stats': {
-                    'total_lines': self.total_lines_processed,
-                    'total_matches': self.total_matches
-                }
+        """Get the analysis results as JSON-ready primitives"""
+        # One pass over the defaultdicts: inner dicts become lists and
+        # the unique-message sets become lists, so the result serializes
+        # directly without another conversion walk
+        return {
+            'alerts': dict(self.alerts),
+            'grouped_messages': {
+                level: {group: list(msgs) for group, msgs in groups.items()}
+                for level, groups in self.grouped_messages.items()
+            },
+            'unique_messages': {
+                level: list(msgs)
+                for level, msgs in self.unique_messages.items()
+            },
+            'stats': {
+                'total_lines': self.total_lines_processed,
+                'total_matches': self.total_matches
             }
+        }
 
     def run(self, collector, hours=1):
         """Main analysis loop"""
         print(f"Analyzing logs for the past {hours} hour(s)...")
-        
-        # Get logs using the collector
-        logs = collector.get_logs(hours)
-        
-        if not logs:
-            print("Warning: No logs were collected!")
-            return
-            
-        print(f"Processing {len(logs)} log lines...")
-        
-        # Analyze each log line
-        for line in logs:
-            self.analyze_line(line)
+
+        # Get logs using the collector; pass the shown levels so the
+        # collector can filter at the source when it knows how
+        try:
+            logs = collector.get_logs(hours, show_levels=self.show_levels)
+        except TypeError:
+            logs = collector.get_logs(hours)
+
+        if isinstance(logs, list):
+            if not logs:
+                print("Warning: No logs were collected!")
+                return
+
+            print(f"Processing {len(logs)} log lines...")
+
+            # Big batches are embarrassingly parallel: fan out across
+            # cores and merge counters; smaller ones stay in-process
+            if len(logs) > _PARALLEL_THRESHOLD:
+                self._analyze_parallel(logs)
+            else:
+                self.analyze_lines(logs)
+        else:
+            # Streaming collector: analyze in batches as lines arrive so
+            # analysis overlaps collection and the full log text is never
+            # held in memory at once
+            batch = list(islice(logs, _STREAM_BATCH))
+            if not batch:
+                print("Warning: No logs were collected!")
+                return
+            while batch:
+                self.analyze_lines(batch)
+                batch = list(islice(logs, _STREAM_BATCH))
+            print(f"Processed {self.total_lines_processed} log lines")
         
         # Format and output results
+        if self.output_file and self.output_json:
+            # Dump machine-readable results straight to the file; orjson
+            # (when installed) encodes the whole tree in C
+            with open(self.output_file, 'wb') as f:
+                f.write(_dumps(self.get_results()))
+            return
+
         output = self.format_output()
-        
+
         if self.output_file:
             with open(self.output_file, 'w') as f:
                 f.write(output)
@@ -2,10 +2,26 @@
 import subprocess
 from datetime import datetime, timedelta
 import paramiko
-from typing import List, Optional
+from typing import Iterator, Optional
 import platform
 import os
 
+# Keywords behind each level's analyzer pattern, used to push filtering
+# into journalctl/log show so rejected lines never cross into Python
+_LEVEL_TERMS = {
+    'error': ['error', 'failure', 'failed', 'fatal', 'crit'],
+    'warning': ['warning', 'warn'],
+    'info': ['INFO:'],
+}
+
+
+def _grep_pattern(show_levels) -> str:
+    """Build the journalctl --grep alternation for the shown levels"""
+    terms = [t for level in ('error', 'warning', 'info')
+             if level in show_levels for t in _LEVEL_TERMS[level]]
+    return '|'.join(terms)
+
+
 class LogCollector:
     def __init__(self, host: Optional[str] = None, user: Optional[str] = None, 
                  port: int = 22, key_file: Optional[str] = None):
@@ -16,42 +32,73 @@ class LogCollector:
         self.ssh = None
         self.system = platform.system()
 
-    def _get_logs_macos(self, since: str) -> List[str]:
-        """Get logs from local macOS system"""
+    def _stream_command(self, cmd) -> Iterator[str]:
+        """Run a local command and yield its stdout line by line, so
+        analysis can start before collection finishes and the full log
+        text is never buffered in memory"""
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True,
+                                bufsize=1)
         try:
-            # Convert our timestamp to macOS log show format
-            since_dt = datetime.strptime(since, '%Y-%m-%d %H:%M:%S')
-            macos_time = since_dt.strftime('%Y-%m-%d %H:%M:%S')
-            
+            for line in proc.stdout:
+                yield line.rstrip('\n')
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+    def _get_logs_macos(self, since: str, show_levels=None) -> Iterator[str]:
+        """Stream logs from local macOS system"""
+        try:
+            # Filter inside log show itself: lines rejected by the
+            # predicate never cross the pipe into Python
+            if show_levels:
+                clauses = [
+                    f'eventMessage CONTAINS[c] "{term}"'
+                    for level in ('error', 'warning', 'info')
+                    if level in show_levels
+                    for term in _LEVEL_TERMS[level]
+                ]
+            else:
+                clauses = ['eventMessage CONTAINS[c] "error"',
+                           'eventMessage CONTAINS[c] "warning"',
+                           'eventMessage CONTAINS[c] "failure"',
+                           'eventMessage CONTAINS[c] "failed"']
+            predicate = '(' + ' OR '.join(clauses) + ' OR process == "system")'
+
             cmd = [
                 'log', 'show',
-                '--start', macos_time,
+                '--start', since,
                 '--style', 'syslog',  # Make it look more like Linux logs
-                '--predicate', '(eventMessage CONTAINS[c] "error" OR eventMessage CONTAINS[c] "warning" OR eventMessage CONTAINS[c] "failure" OR eventMessage CONTAINS[c] "failed" OR process == "system")'
+                '--predicate', predicate
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return result.stdout.splitlines()
+            yield from self._stream_command(cmd)
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Failed to get macOS logs: {str(e)}")
 
-    def _get_logs_linux(self, since: str) -> List[str]:
-        """Get logs from local Linux system"""
+    def _get_logs_linux(self, since: str, show_levels=None) -> Iterator[str]:
+        """Stream logs from local Linux system"""
         try:
             cmd = ['journalctl', '--since', since]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return result.stdout.splitlines()
+            if show_levels:
+                # Let journalctl (C, indexed journal) drop non-matching
+                # lines before they reach Python (requires systemd >= 237)
+                cmd += ['--grep', _grep_pattern(show_levels),
+                        '--case-sensitive=no']
+            yield from self._stream_command(cmd)
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Failed to get Linux logs: {str(e)}")
 
-    def _get_logs_remote(self, since: str) -> List[str]:
-        """Get logs from remote system via SSH"""
+    def _get_logs_remote(self, since: str, show_levels=None) -> Iterator[str]:
+        """Stream logs from remote system via SSH"""
         self._connect_ssh()
         cmd = f"journalctl --since '{since}'"
+        if show_levels:
+            cmd += f" --grep '{_grep_pattern(show_levels)}' --case-sensitive=no"
         
         try:
             stdin, stdout, stderr = self.ssh.exec_command(cmd)
-            return stdout.read().decode().splitlines()
+            for line in stdout:
+                yield line.rstrip('\n')
         except Exception as e:
             raise RuntimeError(f"Failed to get remote logs: {str(e)}")
         finally:
@@ -103,20 +150,20 @@ class LogCollector:
             except Exception as e:
                 raise RuntimeError(f"Error loading SSH key: {str(e)}")
 
-    def get_logs(self, hours: float = 1) -> List[str]:
-        """Get logs from either local or remote system"""
+    def get_logs(self, hours: float = 1, show_levels=None) -> Iterator[str]:
+        """Lazily stream logs from either local or remote system,
+        filtered at the source when show_levels is given"""
         since = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
         
         try:
             if self.host:
-                return self._get_logs_remote(since)
+                yield from self._get_logs_remote(since, show_levels)
             elif self.system == 'Darwin':
-                return self._get_logs_macos(since)
+                yield from self._get_logs_macos(since, show_levels)
             else:
-                return self._get_logs_linux(since)
+                yield from self._get_logs_linux(since, show_levels)
         except Exception as e:
             print(f"Error collecting logs: {str(e)}")
-            return []
 
     def __del__(self):
         """Clean up SSH connection if it exists"""
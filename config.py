@@ -1,13 +1,26 @@
 # config.py
 import os
 import yaml
+from contextlib import contextmanager
 from pathlib import Path
 from colorama import Fore, Style
 
+# PyYAML's libyaml-backed classes parse/emit several times faster than
+# the pure-Python ones; fall back when the C extension is absent
+try:
+    _YAML_LOADER = yaml.CSafeLoader
+    _YAML_DUMPER = yaml.CSafeDumper
+except AttributeError:
+    _YAML_LOADER = yaml.SafeLoader
+    _YAML_DUMPER = yaml.SafeDumper
+
+
 class Config:
     def __init__(self):
         self.config_dir = os.path.expanduser("~/.config/ai_logs")
         self.config_file = os.path.join(self.config_dir, "config.yaml")
+        self._dirty = False
+        self._batch_depth = 0
         self.config = self._load_config()
 
     def _load_config(self):
@@ -44,7 +57,7 @@ class Config:
             
         try:
             with open(self.config_file, 'r') as f:
-                return yaml.safe_load(f)
+                return yaml.load(f, Loader=_YAML_LOADER)
         except Exception as e:
             print(f"{Fore.RED}Error loading config: {str(e)}{Style.RESET_ALL}")
             return self._load_config()  # Return default config if load fails
@@ -53,10 +66,35 @@ class Config:
         """Save configuration to file"""
         try:
             with open(self.config_file, 'w') as f:
-                yaml.dump(config, f, default_flow_style=False)
+                yaml.dump(config, f, Dumper=_YAML_DUMPER,
+                          default_flow_style=False)
         except Exception as e:
             print(f"{Fore.RED}Error saving config: {str(e)}{Style.RESET_ALL}")
 
+    def _mark_dirty(self):
+        """Record a pending change, writing immediately unless batching"""
+        self._dirty = True
+        if self._batch_depth == 0:
+            self.flush()
+
+    def flush(self):
+        """Write the config to disk if there are unsaved changes"""
+        if self._dirty:
+            self.save_config(self.config)
+            self._dirty = False
+
+    @contextmanager
+    def batch_update(self):
+        """Defer saves while setting several values, flushing once on
+        exit: with config.batch_update(): config.set_api_key(...)"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
     def get_api_key(self, provider):
         """Get API key for specified provider"""
         return self.config.get('api_keys', {}).get(provider)
@@ -66,7 +104,7 @@ class Config:
         if 'api_keys' not in self.config:
             self.config['api_keys'] = {}
         self.config['api_keys'][provider] = key
-        self.save_config(self.config)
+        self._mark_dirty()
         print(f"{Fore.GREEN}API key for {provider} has been saved{Style.RESET_ALL}")
 
     def get_docker_config(self):
@@ -78,7 +116,7 @@ class Config:
         if 'docker' not in self.config:
             self.config['docker'] = {}
         self.config['docker'].update(updates)
-        self.save_config(self.config)
+        self._mark_dirty()
 
     def get_default_settings(self):
         """Get default settings"""
@@ -89,7 +127,7 @@ class Config:
         if 'default_settings' not in self.config:
             self.config['default_settings'] = {}
         self.config['default_settings'][setting] = value
-        self.save_config(self.config)
+        self._mark_dirty()
 
     def show_config(self):
         """Display current configuration"""
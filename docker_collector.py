@@ -1,97 +1,178 @@
 # docker_collector.py
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import json
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 class RemoteDockerLogCollector:
     def __init__(self, ssh_client, config: dict):
         self.ssh = ssh_client
         self.max_lines = config.get('max_log_lines', 1000)
-        self.excluded = config.get('excluded_containers', [])
+        # frozenset gives O(1) exclusion checks per container
+        self.excluded = frozenset(config.get('excluded_containers', []))
         self.socket_path = config.get('socket', '/var/run/docker.sock')
 
-    def _exec_command(self, command: str) -> tuple:
-        """Execute command over SSH and return output"""
+    def _open_channel(self, command: str):
+        """Open one exec channel on the existing transport"""
         # Add DOCKER_HOST environment variable if custom socket is specified
         if self.socket_path:
             command = f'DOCKER_HOST="unix://{self.socket_path}" {command}'
-        stdin, stdout, stderr = self.ssh.exec_command(command)
-        return stdout.read().decode('utf-8'), stderr.read().decode('utf-8')
+        channel = self.ssh.get_transport().open_session()
+        channel.exec_command(command)
+        return channel
+
+    @staticmethod
+    def _drain_stderr(channel, chunks: list) -> threading.Thread:
+        """Read stderr on a background thread; reading the two streams
+        serially can deadlock the channel window once either side
+        buffers more than paramiko's window size"""
+        def _drain():
+            chunks.append(channel.makefile_stderr('rb').read())
+
+        drainer = threading.Thread(target=_drain, daemon=True)
+        drainer.start()
+        return drainer
+
+    def _exec_command(self, command: str) -> tuple:
+        """Execute command over SSH and return output"""
+        channel = self._open_channel(command)
+        stderr_chunks = []
+        drainer = self._drain_stderr(channel, stderr_chunks)
+        stdout = channel.makefile('rb').read().decode('utf-8')
+        drainer.join()
+        channel.close()
+        return stdout, b''.join(stderr_chunks).decode('utf-8')
+
+    def _exec_stream(self, command: str) -> Iterator[str]:
+        """Yield stdout lines from a remote command as they arrive, so
+        callers can pipeline parsing with the transfer instead of
+        waiting for the full output to buffer"""
+        channel = self._open_channel(command)
+        stderr_chunks = []
+        drainer = self._drain_stderr(channel, stderr_chunks)
+        try:
+            for line in channel.makefile('r'):
+                yield line.rstrip('\n')
+        finally:
+            drainer.join(timeout=5)
+            channel.close()
+            err = b''.join(stderr_chunks).decode('utf-8', 'replace').strip()
+            if err:
+                print(f"Warning: {err}")
 
     def get_containers(self) -> List[Dict]:
         """Get list of running containers"""
-        command = 'docker ps --format "{{.ID}}\t{{.Names}}\t{{.Image}}\t{{.Status}}"'
+        # JSON output survives tabs/special chars in names where the
+        # tab-separated format would shear the line apart
+        command = 'docker ps --format "{{json .}}"'
         stdout, stderr = self._exec_command(command)
-        
+
         if stderr:
             print(f"Warning getting containers: {stderr}")
             return []
-            
+
         containers = []
         for line in stdout.splitlines():
             if not line.strip():
                 continue
-            id_, name, image, status = line.split('\t')
-            if name not in self.excluded:
+            try:
+                entry = _loads(line)
+            except ValueError:
+                print(f"Error parsing container entry: {line!r}")
+                continue
+            if entry['Names'] not in self.excluded:
                 containers.append({
-                    'id': id_,
-                    'name': name,
-                    'image': image,
-                    'status': status
+                    'id': entry['ID'],
+                    'name': entry['Names'],
+                    'image': entry['Image'],
+                    'status': entry['Status']
                 })
         return containers
 
-    def get_container_logs(self, hours: float = 1, container_name: Optional[str] = None) -> Dict[str, List[str]]:
-        """Get logs from containers"""
+    # Keywords matching the analyzer's level patterns; lines without any
+    # of them are dropped remotely before crossing the SSH pipe
+    LOG_GREP = 'error|failure|failed|fatal|crit|warning|warn|INFO:'
+
+    def collect(self, hours: float = 1, container_name: Optional[str] = None,
+                include_logs: bool = True,
+                include_stats: bool = True) -> tuple:
+        """Collect logs and stats for all containers in one remote shell
+        invocation instead of one SSH channel per container; each SSH
+        exec_command costs a full round-trip, so N containers collapse
+        from N+1 round-trips to 2"""
         since = datetime.now() - timedelta(hours=hours)
         since_arg = since.strftime('%Y-%m-%dT%H:%M:%S')
-        logs = {}
 
-        containers = self.get_containers()
+        containers = [c for c in self.get_containers()
+                      if not container_name or c['name'] == container_name]
+        if not containers:
+            return {}, {}
+
+        parts = []
         for container in containers:
-            # Skip if not the requested container
-            if container_name and container['name'] != container_name:
-                continue
+            if include_logs:
+                parts.append(
+                    f'printf \'\\0CONTAINER %s\\0\' "{container["name"]}"')
+                parts.append(
+                    f'docker logs --since {since_arg} --tail {self.max_lines}'
+                    f' --timestamps {container["id"]} 2>&1'
+                    f' | grep -aEi \'{self.LOG_GREP}\'')
+            if include_stats:
+                parts.append(
+                    f'printf \'\\0STATS %s\\0\' "{container["name"]}"')
+                parts.append(
+                    f'docker stats --no-stream --format \'{{{{json .}}}}\''
+                    f' {container["id"]}')
+        stdout, stderr = self._exec_command('; '.join(parts))
 
-            command = f'docker logs --since {since_arg} --tail {self.max_lines} --timestamps {container["id"]}'
-            stdout, stderr = self._exec_command(command)
-            
-            if stderr:
-                print(f"Warning getting logs for {container['name']}: {stderr}")
-                continue
-                
-            if stdout:
-                logs[container['name']] = stdout.splitlines()
+        if stderr:
+            print(f"Warning collecting container data: {stderr}")
 
-        return logs
+        by_name = {c['name']: c for c in containers}
+        logs: Dict[str, List[str]] = {}
+        stats: Dict[str, Dict] = {}
 
-    def get_container_stats(self, container_name: Optional[str] = None) -> Dict[str, Dict]:
-        """Get current stats for containers"""
-        stats = {}
-        
-        containers = self.get_containers()
-        for container in containers:
-            # Skip if not the requested container
-            if container_name and container['name'] != container_name:
+        # Records alternate marker, payload; split on the NUL delimiters
+        mode = name = None
+        for record in stdout.split('\0'):
+            if record.startswith('CONTAINER '):
+                mode, name = 'logs', record[len('CONTAINER '):]
                 continue
-
-            # Get container stats
-            command = f'docker stats {container["id"]} --no-stream --format "{{{{json .}}}}"'
-            stdout, stderr = self._exec_command(command)
-            
-            if stderr:
-                print(f"Warning getting stats for {container['name']}: {stderr}")
+            if record.startswith('STATS '):
+                mode, name = 'stats', record[len('STATS '):]
                 continue
-                
-            if stdout:
+            if name is None or not record.strip():
+                continue
+            if mode == 'logs':
+                logs[name] = record.splitlines()
+            else:
                 try:
-                    container_stats = json.loads(stdout)
-                    stats[container['name']] = {
+                    container = by_name[name]
+                    stats[name] = {
                         'status': container['status'],
                         'image': container['image'],
-                        'stats': container_stats
+                        'stats': json.loads(record)
                     }
-                except json.JSONDecodeError:
-                    print(f"Error parsing stats for {container['name']}")
+                except (json.JSONDecodeError, KeyError):
+                    print(f"Error parsing stats for {name}")
+            name = None
+
+        return logs, stats
+
+    def get_container_logs(self, hours: float = 1, container_name: Optional[str] = None) -> Dict[str, List[str]]:
+        """Get logs from containers"""
+        logs, _ = self.collect(hours=hours, container_name=container_name,
+                               include_stats=False)
+        return logs
 
+    def get_container_stats(self, container_name: Optional[str] = None) -> Dict[str, Dict]:
+        """Get current stats for containers"""
+        _, stats = self.collect(container_name=container_name,
+                                include_logs=False)
         return stats
\ No newline at end of file
@@ -1,60 +1,226 @@
 # local_insights.py
 from collections import defaultdict
 from datetime import datetime
+from itertools import chain
+import multiprocessing
+import os
 import re
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Union
 from colorama import Fore, Style
 
+try:
+    # Optional linear-time engine (google-re2): scans in one DFA pass
+    # where re backtracks, and every insight pattern stays within RE2's
+    # syntax. Hyperscan was considered but is a much heavier dependency
+    # for the handful of patterns here.
+    import re2 as _re
+except ImportError:
+    _re = re
+
+
+def _compile(pattern, flags=0):
+    """Compile with RE2 when available, falling back to re for syntax
+    RE2 rejects. RE2's compile takes no flags argument, so IGNORECASE is
+    translated to an inline (?i); str and bytes patterns both work."""
+    try:
+        if flags & re.IGNORECASE:
+            prefix = b'(?i)' if isinstance(pattern, bytes) else '(?i)'
+            return _re.compile(prefix + pattern)
+        return _re.compile(pattern)
+    except Exception:
+        return re.compile(pattern, flags)
+
+
+# Compiled once at import; _extract_timestamp runs per log line and a
+# string-pattern re.match pays the re._compile cache probe every call.
+# The groups feed the datetime constructor directly - strptime would
+# re-interpret its format string on every call
+_TS_RE = _compile(r'(\w{3})\s+(\d+)\s+(\d{2}):(\d{2}):(\d{2})')
+_TS_RE_B = _compile(rb'(\w{3})\s+(\d+)\s+(\d{2}):(\d{2}):(\d{2})')
+_MONTHS = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+           'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+_VZDUMP_RE = _compile(r'vzdump ([\d\s]+)')
+
+# One case-insensitive scan buckets an error message without allocating
+# a lowered copy of it first
+_ERR_BUCKETS = _compile(r'docker|service|permission', re.IGNORECASE)
+
+# Below this the Pool spawn/pickle overhead outweighs the regex work
+_PARALLEL_THRESHOLD = 10000
+
+# Group indexes within the combined backup pattern; dispatching on
+# m.lastindex (instead of lastgroup) behaves identically across re and
+# RE2 for both str and bytes lines, where RE2 reports bytes group names
+_G_START, _G_VMS = 1, 2
+_G_VM_START, _G_VS_ID = 3, 4
+_G_VM_FINISH, _G_VF_ID, _G_VF_DUR = 5, 6, 7
+_G_SUCCESS = 8
+
+
+def _analyze_backup_chunk(messages: List[str]) -> Dict:
+    """Pool worker: run the serial backup pass over one chunk.
+
+    Top-level so it pickles; chunks are split at job-start lines, so no
+    in-progress job state ever crosses a chunk boundary.
+    """
+    return dict(LocalInsights().analyze_backups(messages))
+
+
 class LocalInsights:
     def __init__(self):
+        # Resolved once; syslog lines carry no year and asking
+        # datetime.now() per parsed line is wasted work
+        self._current_year = datetime.now().year
+
+        # Compiled once; the analysis loops run these per message and
+        # per-call pattern-cache lookups add up on large logs
+        # Anchored with a bounded lazy prefix: an unanchored search
+        # retries the pattern at every offset of the line, while the
+        # {0,200} bound caps how far a syslog prefix can push the match
         self.backup_patterns = {
-            'start': r'INFO: starting new backup job:.*',
-            'vm_start': r'INFO: Starting Backup of VM (\d+)',
-            'vm_finish': r'INFO: Finished Backup of VM (\d+) \(([^)]+)\)',
-            'success': r'INFO: Backup job finished successfully',
-            'failure': r'failed|error|warning'
+            'start': _compile(r'^.{0,200}?INFO: starting new backup job:'),
+            'vm_start': _compile(r'^.{0,200}?INFO: Starting Backup of VM (\d+)'),
+            'vm_finish': _compile(r'^.{0,200}?INFO: Finished Backup of VM (\d+) \(([^)]+)\)'),
+            'success': _compile(r'^.{0,200}?INFO: Backup job finished successfully'),
+            'failure': _compile(r'failed|error|warning')
         }
+
+        # All four backup patterns fused into one scan; m.lastgroup names
+        # the record type and the inner groups carry the extractions, so
+        # each message costs one regex call instead of up to four
+        self._backup_combined = _compile(
+            r'^.{0,200}?INFO: '
+            r'(?:(?P<start>starting new backup job:.*?vzdump (?P<vms>[\d\s]+))'
+            r'|(?P<vm_start>Starting Backup of VM (?P<vs_id>\d+))'
+            r'|(?P<vm_finish>Finished Backup of VM (?P<vf_id>\d+) \((?P<vf_dur>[^)]+)\))'
+            r'|(?P<success>Backup job finished successfully))')
+
+        # Bytes twin of the combined pattern: undecoded collector output
+        # is scanned as raw ASCII, skipping the per-line UTF-8 decode
+        # and the wider in-memory str representation
+        self._backup_combined_b = _compile(
+            self._backup_combined.pattern.encode('ascii'))
         
+        # The unbounded '.*' between keyword and 'service' caused O(n^2)
+        # backtracking on long lines; a few \S+ words is what a unit
+        # name actually looks like
         self.service_patterns = {
-            'start': r'Starting .* service',
-            'stop': r'Stopping .* service',
-            'failed': r'Failed to start .* service'
+            'start': _compile(r'^.{0,200}?\bStarting \S+(?: \S+){0,5} service\b'),
+            'stop': _compile(r'^.{0,200}?\bStopping \S+(?: \S+){0,5} service\b'),
+            'failed': _compile(r'^.{0,200}?\bFailed to start \S+(?: \S+){0,5} service\b')
+        }
+
+        # Required literal for each service pattern: a line that lacks
+        # the literal cannot match, and the C-level substring probe
+        # rejects it before the regex engine ever starts
+        self._service_needles = {
+            'start': 'Starting ',
+            'stop': 'Stopping ',
+            'failed': 'Failed to start ',
         }
     
-    def analyze_backups(self, messages: List[str]) -> Dict:
-        """Analyze backup job information"""
+    def analyze_backups(self, messages: Iterable[Union[str, bytes]]) -> Dict:
+        """Analyze backup job information
+
+        Accepts any iterable; the single forward pass never needs the
+        whole log in memory, so streaming collectors can feed it
+        directly. Lines may be str or bytes — bytes are scanned
+        undecoded and only the matched groups pay for a decode, so raw
+        collector output skips the per-line UTF-8 decode entirely.
+        """
         backups = defaultdict(dict)
         current_job = None
-        
-        for msg in messages:
-            if re.search(self.backup_patterns['start'], msg):
-                # Extract backup job details
-                job_details = re.search(r'vzdump ([\d\s]+)', msg)
-                if job_details:
-                    current_job = {
-                        'vms': job_details.group(1).split(),
-                        'start_time': self._extract_timestamp(msg),
-                        'vm_times': {},
-                        'successful': False
-                    }
-            
-            elif current_job and re.search(self.backup_patterns['vm_start'], msg):
-                vm_id = re.search(self.backup_patterns['vm_start'], msg).group(1)
-                current_job['vm_times'][vm_id] = {'start': self._extract_timestamp(msg)}
-            
-            elif current_job and re.search(self.backup_patterns['vm_finish'], msg):
-                vm_id, duration = re.search(self.backup_patterns['vm_finish'], msg).groups()
+
+        # Pick the str or bytes pattern pair once, off the first line,
+        # rather than type-checking every message
+        it = iter(messages)
+        first = next(it, None)
+        if first is None:
+            return backups
+        if isinstance(first, bytes):
+            gate, combined = b'INFO:', self._backup_combined_b
+            dec = lambda s: s.decode('ascii', 'replace')
+        else:
+            gate, combined = 'INFO:', self._backup_combined
+            dec = lambda s: s
+        # Locals resolve via LOAD_FAST; self._extract_timestamp would be
+        # an attribute lookup on every matched line
+        extract = self._extract_timestamp
+
+        for msg in chain((first,), it):
+            # Cheap substring gate, then one combined scan; lastgroup
+            # names the record type and the match carries the groups, so
+            # nothing is ever re-searched for extraction
+            if gate not in msg:
+                continue
+            m = combined.match(msg)
+            if m is None:
+                continue
+
+            kind = m.lastindex
+            if kind == _G_START:
+                current_job = {
+                    'vms': dec(m.group(_G_VMS)).split(),
+                    'start_time': extract(msg),
+                    'vm_times': {},
+                    'successful': False
+                }
+            elif current_job is None:
+                continue
+            elif kind == _G_VM_START:
+                current_job['vm_times'][dec(m.group(_G_VS_ID))] = {
+                    'start': extract(msg)}
+            elif kind == _G_VM_FINISH:
+                vm_id = dec(m.group(_G_VF_ID))
                 if vm_id in current_job['vm_times']:
-                    current_job['vm_times'][vm_id]['duration'] = duration
-            
-            elif current_job and re.search(self.backup_patterns['success'], msg):
+                    current_job['vm_times'][vm_id]['duration'] = dec(m.group(_G_VF_DUR))
+            elif kind == _G_SUCCESS:
+                # Parse the timestamp once; it is both the end time and
+                # the job's key
+                ts = extract(msg)
                 current_job['successful'] = True
-                current_job['end_time'] = self._extract_timestamp(msg)
-                backups[self._extract_timestamp(msg).strftime("%Y-%m-%d %H:%M:%S")] = current_job
+                current_job['end_time'] = ts
+                backups[ts.strftime("%Y-%m-%d %H:%M:%S")] = current_job
                 current_job = None
         
         return backups
 
+    def analyze_backups_parallel(self, messages: List[str],
+                                 workers: int = None) -> Dict:
+        """Analyze backup jobs across CPU cores for large message lists.
+
+        Two passes: the first finds job-start lines, the second hands
+        each worker a [start, start) slice so every job is parsed whole
+        by one process. Falls back to the serial path for small inputs
+        where Pool startup would dominate.
+        """
+        messages = list(messages)
+        workers = workers or os.cpu_count() or 1
+        if len(messages) < _PARALLEL_THRESHOLD or workers < 2:
+            return self.analyze_backups(messages)
+
+        # Pass 1: chunk boundaries must sit on job starts, otherwise a
+        # job's VM lines would land in a worker with no current_job
+        needle = (b'starting new backup job:'
+                  if isinstance(messages[0], bytes)
+                  else 'starting new backup job:')
+        starts = [i for i, msg in enumerate(messages) if needle in msg]
+        if len(starts) < 2:
+            return self.analyze_backups(messages)
+
+        bounds = sorted({starts[(len(starts) * w) // workers]
+                         for w in range(workers)})
+        bounds.append(len(messages))
+        chunks = [messages[bounds[i]:bounds[i + 1]]
+                  for i in range(len(bounds) - 1)]
+
+        backups = {}
+        with multiprocessing.Pool(len(chunks)) as pool:
+            # Keys are success timestamps, so partial dicts never collide
+            for partial in pool.imap(_analyze_backup_chunk, chunks):
+                backups.update(partial)
+        return backups
+
     def generate_insights(self, logs: Dict) -> Dict:
         """Generate insights from the logs"""
         insights = {
@@ -71,11 +237,16 @@ class LocalInsights:
         if not backups:
             return {'status': 'No backup information found'}
             
+        # One accumulator instead of a throwaway set per backup
+        vms_backed_up = set()
+        for b in backups.values():
+            vms_backed_up.update(b.get('vms', ()))
+
         summary = {
             'total_backups': len(backups),
             'successful_backups': sum(1 for b in backups.values() if b.get('successful')),
             'average_duration': self._calculate_average_duration(backups),
-            'vms_backed_up': set().union(*[set(b.get('vms', [])) for b in backups.values()]),
+            'vms_backed_up': vms_backed_up,
             'details': backups
         }
         
@@ -85,79 +256,114 @@ class LocalInsights:
         """Analyze error patterns"""
         error_types = defaultdict(int)
         for msg in error_messages:
-            if 'docker' in msg.lower():
-                error_types['docker'] += 1
-            elif 'service' in msg.lower():
-                error_types['service'] += 1
-            elif 'permission' in msg.lower():
-                error_types['permission'] += 1
-            else:
-                error_types['other'] += 1
-                
+            m = _ERR_BUCKETS.search(msg)
+            error_types[m.group().lower() if m else 'other'] += 1
+
         return dict(error_types)
 
     def _analyze_service_status(self, logs: Dict) -> Dict:
         """Analyze service status"""
         service_status = {}
         service_messages = logs.get('grouped_messages', {}).get('service', {})
+
+        # Hoisted out of the loops: per-message dict/attribute lookups
+        # on the patterns become plain local reads
+        failed_re = self.service_patterns['failed']
+        stop_re = self.service_patterns['stop']
+        start_re = self.service_patterns['start']
+        failed_lit = self._service_needles['failed']
+        stop_lit = self._service_needles['stop']
+        start_lit = self._service_needles['start']
         
         for service_name, messages in service_messages.items():
-            if any(re.search(self.service_patterns['failed'], msg) for msg in messages):
-                service_status[service_name] = 'Failed'
-            elif any(re.search(self.service_patterns['stop'], msg) for msg in messages):
-                service_status[service_name] = 'Stopped'
-            elif any(re.search(self.service_patterns['start'], msg) for msg in messages):
-                service_status[service_name] = 'Started'
+            # One pass per service instead of one any() sweep per state;
+            # Failed outranks Stopped outranks Started, and a Failed hit
+            # ends the scan early
+            status = None
+            for msg in messages:
+                # Only lines mentioning 'service' can match any pattern,
+                # and each pattern needs its literal needle present
+                if 'service' not in msg:
+                    continue
+                if failed_lit in msg and failed_re.match(msg):
+                    status = 'Failed'
+                    break
+                if status != 'Stopped' and stop_lit in msg and stop_re.match(msg):
+                    status = 'Stopped'
+                elif status is None and start_lit in msg and start_re.match(msg):
+                    status = 'Started'
+            if status is not None:
+                service_status[service_name] = status
                 
         return service_status
 
-    def format_insights(self, insights: Dict) -> str:
-        """Format insights for display"""
-        output = []
-        
-        output.append(f"\n{Fore.GREEN}=== System Insights ==={Style.RESET_ALL}\n")
-        
-        # Backup insights
+    def format_insights(self, insights: Dict,
+                        out: Optional[TextIO] = None) -> Optional[str]:
+        """Format insights for display.
+
+        Given `out`, lines are written to the stream as they are
+        rendered, so a long report never sits fully in memory; without
+        it the joined string is returned as before.
+        """
+        if out is not None:
+            for line in self._render_insights(insights):
+                print(line, file=out)
+            return None
+        return "\n".join(self._render_insights(insights))
+
+    def _render_insights(self, insights: Dict) -> Iterator[str]:
+        """Yield the report lines in display order"""
+        yield f"\n{Fore.GREEN}=== System Insights ==={Style.RESET_ALL}\n"
+
+        # Backup insights; each fixed section is one f-string instead of
+        # a trail of small yields
         if insights.get('backup_summary'):
-            output.append(f"{Fore.CYAN}Backup Analysis:{Style.RESET_ALL}")
             backup_sum = insights['backup_summary']
             if backup_sum.get('total_backups'):
-                output.append(f"• Total backup jobs: {backup_sum['total_backups']}")
-                output.append(f"• Successful backups: {backup_sum['successful_backups']}")
-                output.append(f"• VMs backed up: {len(backup_sum['vms_backed_up'])}")
+                yield (
+                    f"{Fore.CYAN}Backup Analysis:{Style.RESET_ALL}\n"
+                    f"• Total backup jobs: {backup_sum['total_backups']}\n"
+                    f"• Successful backups: {backup_sum['successful_backups']}\n"
+                    f"• VMs backed up: {len(backup_sum['vms_backed_up'])}")
                 if backup_sum.get('average_duration'):
-                    output.append(f"• Average duration: {backup_sum['average_duration']}")
-                
+                    yield f"• Average duration: {backup_sum['average_duration']}"
+
                 # Detailed backup information
-                output.append("\nDetailed Backup Information:")
+                yield "\nDetailed Backup Information:"
+                ok = f"{Fore.GREEN}✓{Style.RESET_ALL}"
+                bad = f"{Fore.RED}✗{Style.RESET_ALL}"
                 for timestamp, backup in backup_sum.get('details', {}).items():
-                    status = f"{Fore.GREEN}✓{Style.RESET_ALL}" if backup['successful'] else f"{Fore.RED}✗{Style.RESET_ALL}"
-                    output.append(f"{status} {timestamp}: {len(backup['vms'])} VMs")
+                    yield (f"{ok if backup['successful'] else bad}"
+                           f" {timestamp}: {len(backup['vms'])} VMs")
             else:
-                output.append("No backup jobs found in the analyzed time period")
-        
+                yield (f"{Fore.CYAN}Backup Analysis:{Style.RESET_ALL}\n"
+                       "No backup jobs found in the analyzed time period")
+
         # Error pattern insights
         if insights.get('error_patterns'):
-            output.append(f"\n{Fore.CYAN}Error Patterns:{Style.RESET_ALL}")
+            yield f"\n{Fore.CYAN}Error Patterns:{Style.RESET_ALL}"
             for error_type, count in insights['error_patterns'].items():
-                output.append(f"• {error_type.title()}: {count} occurrences")
-        
+                yield f"• {error_type.title()}: {count} occurrences"
+
         # Service status insights
         if insights.get('service_status'):
-            output.append(f"\n{Fore.CYAN}Service Status:{Style.RESET_ALL}")
+            yield f"\n{Fore.CYAN}Service Status:{Style.RESET_ALL}"
             for service, status in insights['service_status'].items():
-                output.append(f"• {service}: {status}")
-        
-        return "\n".join(output)
+                yield f"• {service}: {status}"
 
-    def _extract_timestamp(self, msg: str) -> datetime:
-        """Extract timestamp from log message"""
-        timestamp_match = re.match(r'(\w+\s+\d+\s+\d{2}:\d{2}:\d{2})', msg)
+    def _extract_timestamp(self, msg: Union[str, bytes]) -> datetime:
+        """Extract timestamp from a str or bytes log message"""
+        timestamp_match = (_TS_RE_B if isinstance(msg, bytes) else _TS_RE).match(msg)
         if timestamp_match:
+            mon, day, hour, minute, sec = timestamp_match.groups()
+            if isinstance(mon, bytes):
+                # int() takes ASCII bytes directly; only the month name
+                # needs decoding for the table lookup
+                mon = mon.decode('ascii')
             try:
-                current_year = datetime.now().year
-                return datetime.strptime(f"{current_year} {timestamp_match.group(1)}", "%Y %b %d %H:%M:%S")
-            except ValueError:
+                return datetime(self._current_year, _MONTHS[mon], int(day),
+                                int(hour), int(minute), int(sec))
+            except (KeyError, ValueError):
                 return datetime.now()
         return datetime.now()
 
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # main.py
 import argparse
+import re
 import sys
 import os
 import json
@@ -17,6 +18,25 @@ from ai_providers import get_ai_provider
 from local_insights import LocalInsights
 from config import Config
 
+# Time-of-day field of a syslog line (month, day, HH:MM:SS); anchored so
+# non-matching lines are rejected in one C-level call
+_TIMELINE_TS_RE = re.compile(r'^\S+\s+\S+\s+\S+\s+(\d{2}:\d{2}:\d{2})')
+
+# The no-filter default; a shared frozenset costs nothing per run and
+# is only copied when an --ignore filter actually narrows it
+_ALL_LEVELS = frozenset({'error', 'warning', 'info'})
+
+# TextBlock repr artifacts stripped from AI responses in one sub() pass
+# instead of one full string copy per replace()
+_TEXTBLOCK_SUBS = {
+    "TextBlock(text='": '',
+    "', type='text')": '',
+    ' === ===': '===',
+    '[ ': '',
+    ' ]': '',
+}
+_TEXTBLOCK_RE = re.compile('|'.join(re.escape(k) for k in _TEXTBLOCK_SUBS))
+
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description='Advanced log analyzer for system logs',
@@ -121,15 +141,16 @@ def format_ai_recommendations(recommendations: Dict) -> str:
     output.append(f"\n{severity_info[0]}Severity: {severity_info[1]} {severity}{Style.RESET_ALL}")
     
     # Calculate timing between first and last errors
+    # One anchored match per message pulls out the time field; the old
+    # code only matched lines containing a hard-coded date and allocated
+    # a full split() list just to keep one element
     times = []
     for type_msgs in recommendations.get('results', {}).values():
         for msg in type_msgs:
-            if isinstance(msg, str) and 'Nov 07' in msg:  # Adjust date pattern as needed
-                try:
-                    time_str = msg.split()[3]  # Extract time part
-                    times.append(time_str)
-                except IndexError:
-                    continue
+            if isinstance(msg, str):
+                m = _TIMELINE_TS_RE.match(msg)
+                if m:
+                    times.append(m.group(1))
     
     if times:
         first_time = min(times)
@@ -139,12 +160,12 @@ def format_ai_recommendations(recommendations: Dict) -> str:
     # Format the detailed analysis
     if 'summary' in recommendations:
         content = str(recommendations['summary'])
-        # Clean up TextBlock formatting
-        content = content.replace("TextBlock(text='", "")
-        content = content.replace("', type='text')", "")
-        content = content.replace(" === ===", "===")
+        # Clean up TextBlock formatting; escaped newlines are handled
+        # separately since that replacement inserts text rather than
+        # stripping it
+        content = _TEXTBLOCK_RE.sub(lambda m: _TEXTBLOCK_SUBS[m.group()],
+                                    content)
         content = content.replace("\\n", "\n")
-        content = content.replace("[ ", "").replace(" ]", "")
         
         # Split into sections and format
         sections = content.split('===')
@@ -227,7 +248,11 @@ def main():
         )
         
         # Determine which severity levels to show
-        show_levels = set(['error', 'warning', 'info'])
+        show_levels = _ALL_LEVELS
+
+        # Filled in by the Docker and --system-info branches below; an
+        # explicit None beats rebuilding locals() for membership tests
+        system_info = None
         
         # Handle exclusive filters
         if args.only_errors:
@@ -239,11 +264,11 @@ def main():
             
         # Handle ignore filters
         if args.ignore:
+            show_levels = set(show_levels)
             for level in args.ignore:
                 # Convert 'warnings' to 'warning' if needed
                 level = level.rstrip('s')
-                if level in show_levels:
-                    show_levels.remove(level)
+                show_levels.discard(level)
 
         # Create analyzer instance
         analyzer = LogAnalyzer(
@@ -275,31 +300,25 @@ def main():
                 # Use the existing SSH connection from the collector
                 docker_collector = RemoteDockerLogCollector(collector.ssh, docker_config)
                 
-                # Get Docker logs
-                docker_logs = docker_collector.get_container_logs(
+                # Get Docker logs and stats in one batched remote call
+                docker_logs, container_stats = docker_collector.collect(
                     hours=args.time,
-                    container_name=args.container if args.container else None
+                    container_name=args.container if args.container else None,
+                    include_stats=not args.no_container_stats
                 )
-                
+
                 if not docker_logs:
                     print(f"{Fore.YELLOW}No Docker logs found{Style.RESET_ALL}")
                 else:
-                    # Get container stats if not disabled
-                    container_stats = None
-                    if not args.no_container_stats:
-                        container_stats = docker_collector.get_container_stats(
-                            container_name=args.container if args.container else None
-                        )
-                    
                     # Analyze Docker logs
                     for container, logs in docker_logs.items():
                         print(f"\nAnalyzing logs for container: {container}")
-                        for line in logs:
-                            analyzer.analyze_line(line)
-                        
+                        # Batch scan beats calling analyze_line per line
+                        analyzer.analyze_lines(logs)
+
                     # Add container stats to system info for AI analysis
                     if container_stats and (args.ai or args.compare):
-                        if 'system_info' not in locals():
+                        if system_info is None:
                             system_info = {}
                         system_info['docker'] = container_stats
                         
@@ -326,13 +345,13 @@ def main():
                     sys.exit(1)
             
             try:
-                from ai_providers import get_ai_provider
+                from ai_providers import get_ai_provider, analyze_with_all
 
                 # Load system info if provided
                 if args.system_info:
                     try:
                         with open(args.system_info) as f:
-                            if 'system_info' not in locals():
+                            if system_info is None:
                                 system_info = json.load(f)
                             else:
                                 system_info.update(json.load(f))
@@ -340,8 +359,9 @@ def main():
                         print(f"{Fore.YELLOW}Error loading system info: {str(e)}{Style.RESET_ALL}")
 
                 if args.compare:
-                    # Run analysis with all providers
-                    results = {}
+                    # Build all configured providers, then fan the API calls
+                    # out in parallel instead of paying each latency in turn
+                    providers = {}
                     for provider in valid_providers:
                         try:
                             # Get API key for each provider
@@ -349,16 +369,20 @@ def main():
                             if not provider_key:
                                 print(f"{Fore.YELLOW}Skipping {provider}: No API key found{Style.RESET_ALL}")
                                 continue
-                                
-                            ai_provider = get_ai_provider(provider, provider_key)
-                            print(f"\nRunning analysis with {provider.title()}...")
-                            results[provider] = ai_provider.analyze_logs(
-                                analyzer.get_results(args.summary), 
-                                system_info if 'system_info' in locals() else None
-                            )
+
+                            providers[provider] = get_ai_provider(provider, provider_key)
                         except Exception as e:
                             print(f"Error with {provider}: {str(e)}")
 
+                    results = {}
+                    if providers:
+                        print(f"\nRunning analysis with {', '.join(p.title() for p in providers)} in parallel...")
+                        results = analyze_with_all(
+                            providers,
+                            analyzer.get_results(args.summary),
+                            system_info
+                        )
+
                     # Print comparison
                     if results:
                         print("\n=== AI Analysis Comparison ===")
@@ -376,7 +400,7 @@ def main():
                         # Get AI recommendations
                         recommendations = ai_provider.analyze_logs(
                             analyzer.get_results(args.summary), 
-                            system_info if 'system_info' in locals() else None
+                            system_info
                         )
 
                         # Print formatted recommendations
@@ -0,0 +1,70 @@
+# response_cache.py
+import hashlib
+import json
+from functools import wraps
+from typing import Dict, Optional
+
+from cachetools import TTLCache
+
+# Shared across all providers: identical (provider, logs, system_info)
+# tuples short-circuit the API round-trip for 15 minutes.
+_CACHE_MAXSIZE = 1024
+_CACHE_TTL = 900  # seconds
+
+_cache = TTLCache(maxsize=_CACHE_MAXSIZE, ttl=_CACHE_TTL)
+
+
+def _canonicalize(obj):
+    """Convert logs/system_info into a stable JSON-serializable form.
+
+    Sets are sorted so the digest does not depend on iteration order.
+    """
+    if isinstance(obj, dict):
+        return {str(k): _canonicalize(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_canonicalize(v) for v in obj]
+    elif isinstance(obj, (set, frozenset)):
+        return sorted(str(v) for v in obj)
+    elif isinstance(obj, (str, int, float, bool, type(None))):
+        return obj
+    return str(obj)
+
+
+def analysis_cache_key(provider_name: str, logs: Dict, system_info: Optional[Dict] = None) -> bytes:
+    """Compute a compact digest identifying one analysis request"""
+    payload = json.dumps(
+        [provider_name, _canonicalize(logs), _canonicalize(system_info)],
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
+def clear_cache():
+    """Drop all cached analysis results"""
+    _cache.clear()
+
+
+def cached_analysis(func):
+    """Cache analyze_logs results keyed by the normalized log digest.
+
+    Pass bypass_cache=True to force a fresh API call. Error results are
+    never stored so transient failures don't stick for the full TTL.
+    """
+    @wraps(func)
+    def wrapper(self, logs: Dict, system_info: Optional[Dict] = None,
+                bypass_cache: bool = False, **kwargs):
+        if bypass_cache:
+            return func(self, logs, system_info, **kwargs)
+
+        key = analysis_cache_key(type(self).__name__, logs, system_info)
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = func(self, logs, system_info, **kwargs)
+        if result and result.get('severity') != 'error':
+            _cache[key] = result
+        return result
+
+    return wrapper